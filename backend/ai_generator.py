@@ -1,77 +1,65 @@
 import requests
 import os
+import json
 import time
 import logging
 from dotenv import load_dotenv
-import jwt
-import datetime
+import threading
+from iam_token import get_token_manager
+from http_client import get_http_client, backoff_delay, RETRYABLE_STATUS_CODES
+from response_cache import get_response_cache, make_cache_key
+from concurrency import get_limiter
+from template_registry import get_template
+from log_config import log_payload
+from metrics import stage, UPSTREAM_ERRORS, UPSTREAM_RETRIES
 
 load_dotenv()
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('yagpt_requests.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
+FINAL_STATUS = 'ALTERNATIVE_STATUS_FINAL'
+YANDEX_GPT_API_URL = os.getenv('YANDEX_GPT_API_URL', "https://llm.api.cloud.yandex.net/foundationModels/v1/completion")
+
 class YandexGPT:
     def __init__(self):
-        self.iam_token = os.getenv('YC_IAM_TOKEN')
+        self.token_manager = get_token_manager()
+        self.http = get_http_client()
+        self.cache = get_response_cache()
+        self.limiter = get_limiter()
         self.folder_id = os.getenv('YC_FOLDER_ID')
-        self.api_url = "https://llm.api.cloud.yandex.net/foundationModels/v1/completion"
+        self.api_url = YANDEX_GPT_API_URL
         
     def _get_iam_token(self):
-        if not all([os.getenv('YC_SERVICE_ACCOUNT_ID'), 
-                   os.getenv('YC_ACCESS_KEY_ID'), 
-                   os.getenv('YC_PRIVATE_KEY')]):
-            return self.iam_token
-            
-        token_url = "https://iam.api.cloud.yandex.net/iam/v1/tokens"
-        jwt_token = self._create_jwt()
-        
-        try:
-            response = requests.post(token_url, json={"jwt": jwt_token})
-            response.raise_for_status()
-            return response.json().get("iamToken")
-        except Exception as e:
-            logger.error(f"Failed to get IAM token: {str(e)}")
-            return self.iam_token
-    
-    def _create_jwt(self):
-        now = datetime.datetime.utcnow()
-        service_account_id = os.getenv('YC_SERVICE_ACCOUNT_ID')
-        key_id = os.getenv('YC_ACCESS_KEY_ID')
-        private_key = os.getenv('YC_PRIVATE_KEY').replace('\\n', '\n')
-        
-        payload = {
-            "aud": "https://iam.api.cloud.yandex.net/iam/v1/tokens",
-            "iss": service_account_id,
-            "iat": now,
-            "exp": now + datetime.timedelta(hours=1)
-        }
+        with stage('iam_token'):
+            return self.token_manager.get_token()
         
-        return jwt.encode(
-            payload,
-            private_key,
-            algorithm="PS256",
-            headers={"kid": key_id}
-        )
+    def generate(self, prompt, use_cache=True):
+        data = self._build_request(prompt)
+        cache_key = self._cache_key(data)
         
-    def generate(self, prompt):
-        headers = {
-            "Authorization": f"Bearer {self._get_iam_token()}",
-            "x-folder-id": self.folder_id,
-            "Content-Type": "application/json"
-        }
+        if use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("Yandex GPT response served from cache")
+                return cached
+        else:
+            self.cache.record_bypass()
+        
+        with self.limiter.slot():
+            text = self._complete(data)
+        self.cache.set(cache_key, text)
+        return text
         
-        data = {
+    def _cache_key(self, data):
+        # Потоковый и обычный режимы дают один и тот же ответ и делят запись в кэше
+        options = {k: v for k, v in data['completionOptions'].items() if k != 'stream'}
+        return make_cache_key(data['messages'], data['modelUri'], options)
+        
+    def _build_request(self, prompt, stream=False):
+        return {
             "modelUri": f"gpt://{self.folder_id}/yandexgpt-lite/rc",
             "completionOptions": {
-                "stream": False,
+                "stream": stream,
                 "temperature": 0.8,
                 "maxTokens": 4000
             },
@@ -92,43 +80,134 @@ class YandexGPT:
             ]
         }
         
-        max_retries = 3
+    def _post(self, data, stream=False):
+        iam_token = self._get_iam_token()
+        headers = {
+            "Authorization": f"Bearer {iam_token}",
+            "x-folder-id": self.folder_id,
+            "Content-Type": "application/json"
+        }
+        
+        max_retries = self.http.max_retries
         for attempt in range(max_retries):
             try:
-                logger.info(f"Sending request to Yandex GPT (attempt {attempt + 1})")
-                response = requests.post(self.api_url, headers=headers, json=data)
+                logger.info("Sending request to Yandex GPT (attempt %d)", attempt + 1)
+                # Для потокового ответа это время до получения заголовков
+                with stage('upstream_call'):
+                    response = self.http.post(self.api_url, headers=headers, json=data, stream=stream)
+                if not response.ok:
+                    # Непрочитанный потоковый ответ держит соединение из пула, пока его не закроют
+                    response.close()
                 response.raise_for_status()
-                result = response.json()
-                
-                logger.info(f"Full Yandex GPT response: {result}")
-                
-                if 'result' not in result or 'alternatives' not in result['result']:
-                    raise ValueError("Invalid response format from Yandex GPT")
-                
-                return result['result']['alternatives'][0]['message']['text']
+                return response
                 
             except requests.exceptions.HTTPError as e:
+                UPSTREAM_ERRORS.inc(service='llm', status=e.response.status_code)
                 if e.response.status_code == 401:
-                    self.iam_token = self._get_iam_token()
-                    headers["Authorization"] = f"Bearer {self.iam_token}"
+                    UPSTREAM_RETRIES.inc(reason='401')
+                    with stage('iam_token'):
+                        iam_token = self.token_manager.invalidate(iam_token)
+                    headers["Authorization"] = f"Bearer {iam_token}"
+                    continue
+                if e.response.status_code in RETRYABLE_STATUS_CODES and attempt < max_retries - 1:
+                    logger.warning(f"Retryable HTTP Error: {str(e)}")
+                    UPSTREAM_RETRIES.inc(reason=e.response.status_code)
+                    with stage('retry_backoff'):
+                        time.sleep(backoff_delay(attempt))
                     continue
                 logger.error(f"HTTP Error: {str(e)}")
                 raise Exception(f"Yandex GPT error: HTTP {e.response.status_code}")
             except Exception as e:
+                UPSTREAM_ERRORS.inc(service='llm', status='no_response')
                 logger.error(f"Error in Yandex GPT request: {str(e)}")
                 if attempt == max_retries - 1:
                     raise Exception(f"Failed to get response from Yandex GPT: {str(e)}")
-                time.sleep(1)
+                UPSTREAM_RETRIES.inc(reason='connection')
+                with stage('retry_backoff'):
+                    time.sleep(backoff_delay(attempt))
         
         raise Exception("Yandex GPT error: Max retries exceeded")
+        
+    def _complete(self, data):
+        result = self._post(data).json()
+        
+        log_payload(logger, "Full Yandex GPT response", result)
+        
+        if 'result' not in result or 'alternatives' not in result['result']:
+            raise ValueError("Invalid response format from Yandex GPT")
+        
+        return result['result']['alternatives'][0]['message']['text']
+        
+    def generate_stream(self, prompt, use_cache=True):
+        data = self._build_request(prompt, stream=True)
+        cache_key = self._cache_key(data)
+        
+        if use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("Yandex GPT response served from cache")
+                yield cached
+                return
+        else:
+            self.cache.record_bypass()
+        
+        with self.limiter.slot():
+            response = self._post(data, stream=True)
+            text = ''
+            status = None
+            try:
+                # В режиме stream каждая строка ответа - JSON с полным текстом, накопленным к этому моменту
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line:
+                        continue
+                    result = json.loads(line)
+                    if 'result' not in result or 'alternatives' not in result['result']:
+                        raise ValueError("Invalid response format from Yandex GPT")
+                    
+                    alternative = result['result']['alternatives'][0]
+                    partial = alternative['message']['text']
+                    status = alternative.get('status')
+                    if len(partial) > len(text):
+                        yield partial[len(text):]
+                        text = partial
+            finally:
+                response.close()
+        
+        self._cache_stream_result(cache_key, text, status)
+
+    def _cache_stream_result(self, cache_key, text, status):
+        # Поток мог закрыться до конца или остановиться фильтром: кэшируем только полный ответ
+        if status == FINAL_STATUS and text:
+            self.cache.set(cache_key, text)
+        else:
+            logger.warning(f"Yandex GPT stream ended with status {status}, response is not cached")
+        
+_yagpt = None
+_yagpt_lock = threading.Lock()
+
+def get_yandex_gpt():
+    global _yagpt
+    if _yagpt is None:
+        with _yagpt_lock:
+            if _yagpt is None:
+                _yagpt = YandexGPT()
+    return _yagpt
 
-def generate_resume(user_data, resume_type='standard'):
-    yagpt = YandexGPT()
-    prompt = create_prompt(user_data, resume_type)
-    logger.info(f"Generated prompt for Yandex GPT: {prompt}")
-    return yagpt.generate(prompt)
+def generate_resume(user_data, resume_type='standard', use_cache=True, template=None):
+    yagpt = get_yandex_gpt()
+    with stage('create_prompt'):
+        prompt = create_prompt(user_data, resume_type, template)
+    log_payload(logger, "Generated prompt for Yandex GPT", prompt)
+    return yagpt.generate(prompt, use_cache=use_cache)
 
-def create_prompt(user_data, resume_type):
+def generate_resume_stream(user_data, resume_type='standard', use_cache=True, template=None):
+    yagpt = get_yandex_gpt()
+    with stage('create_prompt'):
+        prompt = create_prompt(user_data, resume_type, template)
+    log_payload(logger, "Generated prompt for Yandex GPT", prompt)
+    return yagpt.generate_stream(prompt, use_cache=use_cache)
+
+def create_prompt(user_data, resume_type, template=None):
     format_instructions = {
         'standard': "классический формат с четким структурированием разделов",
         'chronological': "хронологический формат с акцентом на опыт работы",
@@ -140,6 +219,9 @@ def create_prompt(user_data, resume_type):
     target_position = user_data.get('target_position', '')
     position_context = f" для позиции {target_position}" if target_position else ""
     
+    compiled_template = get_template(template)
+    template_instructions = f"\n    6. {compiled_template.prompt_fragment}" if compiled_template else ""
+    
     prompt = f"""
     Создай профессиональное резюме на русском языке в {format_instructions}{position_context}.
     Используй Markdown-разметку. Включи все предоставленные данные.
@@ -170,7 +252,7 @@ def create_prompt(user_data, resume_type):
     2. Используй профессиональный язык
     3. Добавь количественные показатели везде, где возможно
     4. Адаптируй содержание под целевую позицию
-    5. Соблюдай структуру и формат Markdown
+    5. Соблюдай структуру и формат Markdown{template_instructions}
     """
     return prompt
 
@@ -0,0 +1,154 @@
+import json
+import asyncio
+import logging
+import httpx
+from ai_generator import YandexGPT, create_prompt
+from http_client import HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, backoff_delay, RETRYABLE_STATUS_CODES
+from log_config import log_payload
+from metrics import stage, UPSTREAM_ERRORS, UPSTREAM_RETRIES
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncYandexGPT(YandexGPT):
+    def __init__(self):
+        super().__init__()
+        # self.limiter - общий с маршрутами Flask лимит из get_limiter(), здесь занимаем его через aslot()
+        pool_size = max(HTTP_POOL_SIZE, self.limiter.limit)
+        self.async_http = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            # Повторы, как и в синхронном клиенте, делает только _post
+            transport=httpx.AsyncHTTPTransport(retries=0)
+        )
+
+    async def aclose(self):
+        await self.async_http.aclose()
+
+    async def _get_iam_token_async(self, stale_token=None):
+        # Менеджер токенов синхронный: обновление токена уводим в пул потоков, чтобы не блокировать цикл событий
+        with stage('iam_token'):
+            if stale_token is not None:
+                return await asyncio.to_thread(self.token_manager.invalidate, stale_token)
+            return await asyncio.to_thread(self.token_manager.get_token)
+
+    async def generate(self, prompt, use_cache=True):
+        data = self._build_request(prompt)
+        cache_key = self._cache_key(data)
+
+        if use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("Yandex GPT response served from cache")
+                return cached
+        else:
+            self.cache.record_bypass()
+
+        async with self.limiter.aslot():
+            response = await self._post(data)
+            result = response.json()
+
+        log_payload(logger, "Full Yandex GPT response", result)
+
+        if 'result' not in result or 'alternatives' not in result['result']:
+            raise ValueError("Invalid response format from Yandex GPT")
+
+        text = result['result']['alternatives'][0]['message']['text']
+        self.cache.set(cache_key, text)
+        return text
+
+    async def generate_stream(self, prompt, use_cache=True):
+        data = self._build_request(prompt, stream=True)
+        cache_key = self._cache_key(data)
+
+        if use_cache:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("Yandex GPT response served from cache")
+                yield cached
+                return
+        else:
+            self.cache.record_bypass()
+
+        async with self.limiter.aslot():
+            response = await self._post(data, stream=True)
+            text = ''
+            status = None
+            try:
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    result = json.loads(line)
+                    if 'result' not in result or 'alternatives' not in result['result']:
+                        raise ValueError("Invalid response format from Yandex GPT")
+
+                    alternative = result['result']['alternatives'][0]
+                    partial = alternative['message']['text']
+                    status = alternative.get('status')
+                    if len(partial) > len(text):
+                        yield partial[len(text):]
+                        text = partial
+            finally:
+                await response.aclose()
+
+        self._cache_stream_result(cache_key, text, status)
+
+    async def _post(self, data, stream=False):
+        iam_token = await self._get_iam_token_async()
+        headers = {
+            "Authorization": f"Bearer {iam_token}",
+            "x-folder-id": self.folder_id,
+            "Content-Type": "application/json"
+        }
+
+        max_retries = self.http.max_retries
+        for attempt in range(max_retries):
+            try:
+                logger.info("Sending request to Yandex GPT (attempt %d)", attempt + 1)
+                request = self.async_http.build_request("POST", self.api_url, headers=headers, json=data)
+                with stage('upstream_call'):
+                    response = await self.async_http.send(request, stream=stream)
+                if response.is_error:
+                    await response.aclose()
+                response.raise_for_status()
+                return response
+
+            except httpx.HTTPStatusError as e:
+                UPSTREAM_ERRORS.inc(service='llm', status=e.response.status_code)
+                if e.response.status_code == 401:
+                    UPSTREAM_RETRIES.inc(reason='401')
+                    iam_token = await self._get_iam_token_async(stale_token=iam_token)
+                    headers["Authorization"] = f"Bearer {iam_token}"
+                    continue
+                if e.response.status_code in RETRYABLE_STATUS_CODES and attempt < max_retries - 1:
+                    logger.warning(f"Retryable HTTP Error: {str(e)}")
+                    UPSTREAM_RETRIES.inc(reason=e.response.status_code)
+                    with stage('retry_backoff'):
+                        await asyncio.sleep(backoff_delay(attempt))
+                    continue
+                logger.error(f"HTTP Error: {str(e)}")
+                raise Exception(f"Yandex GPT error: HTTP {e.response.status_code}")
+            except Exception as e:
+                UPSTREAM_ERRORS.inc(service='llm', status='no_response')
+                logger.error(f"Error in Yandex GPT request: {str(e)}")
+                if attempt == max_retries - 1:
+                    raise Exception(f"Failed to get response from Yandex GPT: {str(e)}")
+                UPSTREAM_RETRIES.inc(reason='connection')
+                with stage('retry_backoff'):
+                    await asyncio.sleep(backoff_delay(attempt))
+
+        raise Exception("Yandex GPT error: Max retries exceeded")
+
+
+async def generate_resume_async(yagpt, user_data, resume_type='standard', use_cache=True, template=None):
+    with stage('create_prompt'):
+        prompt = create_prompt(user_data, resume_type, template)
+    log_payload(logger, "Generated prompt for Yandex GPT", prompt)
+    return await yagpt.generate(prompt, use_cache=use_cache)
+
+
+def generate_resume_stream_async(yagpt, user_data, resume_type='standard', use_cache=True, template=None):
+    with stage('create_prompt'):
+        prompt = create_prompt(user_data, resume_type, template)
+    log_payload(logger, "Generated prompt for Yandex GPT", prompt)
+    return yagpt.generate_stream(prompt, use_cache=use_cache)
@@ -1,43 +1,90 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context, g
 from flask_cors import CORS
-from ai_generator import generate_resume
+from ai_generator import generate_resume, generate_resume_stream
+from iam_token import get_token_manager
+from response_cache import get_response_cache
+from concurrency import get_limiter, OverloadedError
+from pdf_renderer import get_pdf_renderer
+from render_cache import get_render_cache, make_render_key
+from markdown_parser import markdown_to_html
+from docx_converter import markdown_to_docx
+from template_registry import get_template_registry, get_template
+from batch import run_batch, BATCH_WORKERS, BATCH_RATE_LIMIT, BATCH_MAX_RECORDS
+from ats_engine import get_ats_engine, DEFAULT_SECTIONS
+from vacancy_index import get_vacancy_index, VACANCY_PAGE_SIZE
+from log_config import setup_logging, log_payload, log_request, logging_stats, make_request_id
+from metrics import stage, render_metrics, STAGE_DURATION, REQUEST_DURATION, REQUESTS_IN_FLIGHT
+from profiler import get_profiler
 import os
 from dotenv import load_dotenv
 import logging
-import tempfile
-from docx import Document
-import markdown
-import pdfkit
+import io
+import json
+import time
 from datetime import datetime
 
 load_dotenv()
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('flask_app.log'),
-        logging.StreamHandler()
-    ]
-)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+# Шаблоны разбираются и компилируются один раз при старте процесса
+get_template_registry()
+get_ats_engine()
+get_vacancy_index()
 CORS(app, supports_credentials=True)
 
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['ALLOWED_EXTENSIONS'] = {'pdf', 'docx', 'txt'}
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
 
-PDFKIT_CONFIG = {
-    'page-size': 'A4',
-    'margin-top': '0.75in',
-    'margin-right': '0.75in',
-    'margin-bottom': '0.75in',
-    'margin-left': '0.75in',
-    'encoding': 'UTF-8',
-    'quiet': ''
-}
+@app.before_request
+def start_request_timer():
+    g.started = time.perf_counter()
+    g.request_id = make_request_id(request.headers.get('X-Request-ID'))
+    g.endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    REQUESTS_IN_FLIGHT.inc(endpoint=g.endpoint)
+    g.in_flight = True
+    profiler = get_profiler()
+    if profiler is not None:
+        profiler.start()
+
+@app.after_request
+def log_request_fields(response):
+    # Одна JSON-строка на запрос в access.log; для потоковых ответов время - до отправки заголовков
+    started = g.get('started')
+    response.headers['X-Request-ID'] = g.get('request_id', '')
+    log_request({
+        'request_id': g.get('request_id'),
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'duration_ms': round((time.perf_counter() - started) * 1000, 1) if started else None,
+        'request_bytes': request.content_length or 0,
+        'response_bytes': response.content_length,
+        'streamed': response.is_streamed
+    })
+    if started:
+        REQUEST_DURATION.observe(time.perf_counter() - started, endpoint=g.get('endpoint'),
+                                 method=request.method, status=response.status_code)
+    # direct_passthrough-ответы не вызывают call_on_close, их учет завершается в teardown
+    if response.is_streamed and not response.direct_passthrough and g.pop('in_flight', False):
+        # teardown срабатывает до отправки тела; потоковый ответ считаем завершенным, когда сервер его закроет
+        endpoint, request_id = g.endpoint, g.request_id
+        response.call_on_close(lambda: finish_request_tracking(endpoint, request_id, started))
+    return response
+
+@app.teardown_request
+def finish_request(exc):
+    if g.pop('in_flight', False):
+        finish_request_tracking(g.endpoint, g.request_id, g.started)
+
+def finish_request_tracking(endpoint, request_id, started):
+    REQUESTS_IN_FLIGHT.dec(endpoint=endpoint)
+    profiler = get_profiler()
+    if profiler is not None:
+        profiler.stop(endpoint, request_id, time.perf_counter() - started)
 
 @app.route('/api/generate-resume', methods=['POST'])
 def generate_resume_endpoint():
@@ -52,10 +99,12 @@ def generate_resume_endpoint():
             }), 400
             
         data = request.json
-        logger.info(f"Received data for resume generation: {data}")
+        log_payload(logger, "Received data for resume generation", data)
         
         user_data = data.get('user_data', {})
         resume_type = data.get('resume_type', 'standard')
+        template = data.get('template')
+        use_cache = not data.get('no_cache', False)
         
         if not user_data.get('name'):
             return jsonify({
@@ -63,8 +112,8 @@ def generate_resume_endpoint():
                 'message': 'Поле "ФИО" обязательно для заполнения'
             }), 400
 
-        logger.info(f"Generating {resume_type} resume for {user_data.get('name')}")
-        resume_content = generate_resume(user_data, resume_type)
+        logger.info("Generating %s resume", resume_type)
+        resume_content = generate_resume(user_data, resume_type, use_cache=use_cache, template=template)
         
         logger.info("Resume generated successfully")
         return jsonify({
@@ -72,6 +121,9 @@ def generate_resume_endpoint():
             'resume': resume_content,
             'message': 'Резюме успешно сгенерировано'
         })
+    except OverloadedError as e:
+        logger.warning("Resume generation rejected: too many requests in progress")
+        return overloaded_response(e)
     except Exception as e:
         logger.error(f"Error generating resume: {str(e)}", exc_info=True)
         return jsonify({
@@ -79,6 +131,172 @@ def generate_resume_endpoint():
             'message': f'Ошибка при генерации резюме: {str(e)}'
         }), 500
 
+def overloaded_response(error):
+    response = jsonify({
+        'success': False,
+        'message': 'Сервер перегружен, повторите попытку позже'
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def sse_event(data, event=None):
+    payload = json.dumps(data, ensure_ascii=False)
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
+
+@app.route('/api/generate-resume/stream', methods=['POST'])
+def generate_resume_stream_endpoint():
+    logger.info("Received request to /api/generate-resume/stream")
+    
+    if not request.is_json:
+        return jsonify({
+            'success': False,
+            'message': 'Ожидается JSON в теле запроса'
+        }), 400
+        
+    data = request.json
+    user_data = data.get('user_data', {})
+    resume_type = data.get('resume_type', 'standard')
+    template = data.get('template')
+    use_cache = not data.get('no_cache', False)
+    
+    if not user_data.get('name'):
+        return jsonify({
+            'success': False,
+            'message': 'Поле "ФИО" обязательно для заполнения'
+        }), 400
+
+    def events():
+        chunks = generate_resume_stream(user_data, resume_type, use_cache=use_cache, template=template)
+        try:
+            for chunk in chunks:
+                yield sse_event({'text': chunk})
+            yield sse_event({'success': True, 'message': 'Резюме успешно сгенерировано'}, event='done')
+            logger.info("Resume streamed successfully")
+        except GeneratorExit:
+            # Клиент закрыл соединение: закрываем генератор, чтобы оборвать запрос к Yandex GPT
+            logger.info("Client disconnected, cancelling resume generation")
+            raise
+        except OverloadedError as e:
+            logger.warning("Resume stream rejected: too many requests in progress")
+            yield sse_event({
+                'success': False,
+                'message': 'Сервер перегружен, повторите попытку позже',
+                'retry_after': e.retry_after
+            }, event='error')
+        except Exception as e:
+            logger.error(f"Error streaming resume: {str(e)}", exc_info=True)
+            yield sse_event({
+                'success': False,
+                'message': f'Ошибка при генерации резюме: {str(e)}'
+            }, event='error')
+        finally:
+            chunks.close()
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/generate-resumes/batch', methods=['POST'])
+def generate_resumes_batch_endpoint():
+    logger.info("Received request to /api/generate-resumes/batch")
+    
+    if request.mimetype == 'application/x-ndjson':
+        # Тело запроса в формате JSONL: по одной записи на строку
+        try:
+            records = [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()]
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'Некорректная строка JSONL в теле запроса'
+            }), 400
+        options = request.args
+    elif request.is_json:
+        data = request.get_json(silent=True)
+        if isinstance(data, list):
+            # Тело - просто массив записей, параметры передаются в строке запроса
+            records, options = data, request.args
+        elif isinstance(data, dict):
+            records, options = data.get('records', []), data
+        else:
+            return jsonify({
+                'success': False,
+                'message': 'Ожидается объект {"records": [...]} или массив записей'
+            }), 400
+    else:
+        return jsonify({
+            'success': False,
+            'message': 'Ожидается JSON или JSONL в теле запроса'
+        }), 400
+    
+    if not isinstance(records, list):
+        return jsonify({
+            'success': False,
+            'message': 'Поле "records" должно быть списком'
+        }), 400
+
+    if not records:
+        return jsonify({
+            'success': False,
+            'message': 'Список записей пуст'
+        }), 400
+        
+    if len(records) > BATCH_MAX_RECORDS:
+        return jsonify({
+            'success': False,
+            'message': f'Слишком много записей: максимум {BATCH_MAX_RECORDS}'
+        }), 400
+    
+    try:
+        workers = int(options.get('workers', BATCH_WORKERS))
+    except (TypeError, ValueError):
+        workers = 0
+    if workers < 1:
+        return jsonify({
+            'success': False,
+            'message': 'Параметр "workers" должен быть положительным целым числом'
+        }), 400
+    workers = min(workers, BATCH_WORKERS)
+    completed_ids = options.get('completed_ids', [])
+    if isinstance(completed_ids, str):
+        completed_ids = completed_ids.split(',')
+    if not isinstance(completed_ids, list):
+        return jsonify({
+            'success': False,
+            'message': 'Поле "completed_ids" должно быть списком или строкой через запятую'
+        }), 400
+    # id записей в run_batch - строки
+    completed_ids = [str(record_id) for record_id in completed_ids]
+    resume_type = options.get('resume_type', 'standard')
+    template = options.get('template')
+    # Из строки запроса (JSONL или массив записей) флаг приходит строкой: "0" и "false" не отключают кэш
+    no_cache = options.get('no_cache', False)
+    use_cache = not (no_cache is True or str(no_cache).lower() in ('1', 'true'))
+    
+    logger.info(f"Generating batch of {len(records)} resumes with {workers} workers")
+    
+    def results():
+        for result in run_batch(records, workers, BATCH_RATE_LIMIT, completed_ids, resume_type,
+                                use_cache=use_cache, default_template=template):
+            yield json.dumps(result, ensure_ascii=False) + '\n'
+    
+    return Response(stream_with_context(results()), mimetype='application/x-ndjson')
+
+def render_resume_file(resume_content, format_type, template=None):
+    if format_type == 'pdf':
+        html_content = markdown_to_html(resume_content)
+        with stage('pdf_render'):
+            file_data = get_pdf_renderer().render(html_content, shell=template.html_shell if template else None)
+        
+    elif format_type == 'docx':
+        file_data = markdown_to_docx(resume_content, template)
+    
+    return file_data
+
 @app.route('/api/download-resume', methods=['POST'])
 def download_resume():
     try:
@@ -107,84 +325,201 @@ def download_resume():
                 'message': 'Неподдерживаемый формат файла'
             }), 400
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{format_type}') as temp_file:
-            temp_path = temp_file.name
-            
-            if format_type == 'pdf':
-                html_content = markdown.markdown(resume_content)
-                html_content = f"""
-                <!DOCTYPE html>
-                <html>
-                <head>
-                    <meta charset="UTF-8">
-                    <style>
-                        body {{ font-family: Arial, sans-serif; line-height: 1.6; }}
-                        h1 {{ color: #2c3e50; border-bottom: 2px solid #3498db; }}
-                        h2 {{ color: #2980b9; }}
-                        ul {{ margin-left: 20px; }}
-                        li {{ margin-bottom: 5px; }}
-                    </style>
-                </head>
-                <body>
-                    {html_content}
-                </body>
-                </html>
-                """
-                pdfkit.from_string(html_content, temp_path, options=PDFKIT_CONFIG)
-                
-            elif format_type == 'docx':
-                doc = Document()
-                
-                current_paragraph = None
-                for line in resume_content.split('\n'):
-                    if line.startswith('# '):
-                        doc.add_heading(line[2:], level=1)
-                    elif line.startswith('## '):
-                        doc.add_heading(line[3:], level=2)
-                    elif line.startswith('### '):
-                        doc.add_heading(line[4:], level=3)
-                    elif line.startswith('- '):
-                        if current_paragraph is None:
-                            current_paragraph = doc.add_paragraph()
-                        current_paragraph.add_run('• ' + line[2:] + '\n')
-                    else:
-                        if line.strip():
-                            doc.add_paragraph(line)
-                        current_paragraph = None
-                
-                doc.save(temp_path)
+        template = get_template(data.get('template'))
+        cache_key = make_render_key(resume_content, format_type, f'{template.id}:{template.version}' if template else 'default')
+        etag = cache_key[:32]
+        render_cache = get_render_cache()
+        
+        if request.if_none_match.contains(etag):
+            render_cache.record_not_modified(cache_key)
+            logger.info("Resume file not modified, returning 304")
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
         
-        logger.info(f"File generated successfully: {temp_path}")
+        file_data = render_cache.get(cache_key)
+        if file_data is None:
+            file_data = render_resume_file(resume_content, format_type, template)
+            render_cache.set(cache_key, file_data)
         
-        return send_file(
-            temp_path,
+        logger.info(f"File generated successfully: {len(file_data)} bytes")
+        
+        response = send_file(
+            io.BytesIO(file_data),
             as_attachment=True,
             download_name=f"{file_name}.{format_type}",
-            mimetype=f"application/{format_type}"
+            mimetype=f"application/{format_type}",
+            etag=etag
         )
+        # Тело отдается WSGI-сервером уже после выхода из обработчика, поэтому время отправки замеряем до close();
+        # при direct_passthrough werkzeug не вызывает call_on_close, а файл и так уже в памяти
+        response.direct_passthrough = False
+        send_started = time.perf_counter()
+        response.call_on_close(lambda: STAGE_DURATION.observe(time.perf_counter() - send_started, stage='file_send'))
+        return response
         
+    except OverloadedError as e:
+        logger.warning("PDF rendering rejected: too many renders in progress")
+        return overloaded_response(e)
     except Exception as e:
         logger.error(f"Error generating download file: {str(e)}", exc_info=True)
         return jsonify({
             'success': False,
             'message': f'Ошибка при генерации файла: {str(e)}'
         }), 500
-    finally:
-        try:
-            if 'temp_path' in locals() and os.path.exists(temp_path):
-                os.unlink(temp_path)
-        except Exception as e:
-            logger.error(f"Error deleting temp file: {str(e)}")
+
+def ats_sections(template_id):
+    template = get_template(template_id)
+    return template.sections if template else DEFAULT_SECTIONS
+
+@app.route('/api/ats-check', methods=['POST'])
+def ats_check():
+    logger.info("Received request to /api/ats-check")
+    
+    if not request.is_json:
+        return jsonify({
+            'success': False,
+            'message': 'Ожидается JSON в теле запроса'
+        }), 400
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({
+            'success': False,
+            'message': 'Ожидается JSON-объект в теле запроса'
+        }), 400
+    
+    resume = data.get('resume', '')
+    if not isinstance(resume, str):
+        return jsonify({
+            'success': False,
+            'message': 'Текст резюме должен быть строкой'
+        }), 400
+    if not resume:
+        return jsonify({
+            'success': False,
+            'message': 'Отсутствует текст резюме'
+        }), 400
+    
+    try:
+        result = get_ats_engine().check(
+            resume,
+            target_position=data.get('target_position'),
+            sections=ats_sections(data.get('template')),
+            lang=data.get('lang', 'ru')
+        )
+    except Exception as e:
+        logger.error(f"Error checking resume: {str(e)}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': f'Ошибка при проверке резюме: {str(e)}'
+        }), 500
+    return jsonify(result)
+
+@app.route('/api/ats-check/bulk', methods=['POST'])
+def ats_check_bulk():
+    logger.info("Received request to /api/ats-check/bulk")
+    
+    if not request.is_json:
+        return jsonify({
+            'success': False,
+            'message': 'Ожидается JSON в теле запроса'
+        }), 400
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('resumes', []), list):
+        return jsonify({
+            'success': False,
+            'message': 'Ожидается объект {"resumes": [...]} со списком резюме'
+        }), 400
+    
+    # Элемент списка - текст резюме или {"resume": ..., "target_position": ...}
+    items = [item if isinstance(item, dict) else {'resume': item} for item in data.get('resumes', [])]
+    if not items:
+        return jsonify({
+            'success': False,
+            'message': 'Список резюме пуст'
+        }), 400
+    
+    if len(items) > BATCH_MAX_RECORDS:
+        return jsonify({
+            'success': False,
+            'message': f'Слишком много резюме: максимум {BATCH_MAX_RECORDS}'
+        }), 400
+    
+    try:
+        results = get_ats_engine().check_many(
+            [str(item.get('resume') or '') for item in items],
+            [item.get('target_position', data.get('target_position')) for item in items],
+            sections=ats_sections(data.get('template')),
+            lang=data.get('lang', 'ru')
+        )
+    except Exception as e:
+        logger.error(f"Error checking resumes: {str(e)}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': f'Ошибка при проверке резюме: {str(e)}'
+        }), 500
+    return jsonify({'success': True, 'results': results})
+
+@app.route('/api/vacancies', methods=['GET'])
+def search_vacancies():
+    position = request.args.get('position', '').strip()
+    if not position:
+        return jsonify({
+            'success': False,
+            'message': 'Не указана желаемая должность'
+        }), 400
+    
+    skills = [skill for skill in request.args.get('skills', '').split(',') if skill.strip()]
+    lang = request.args.get('lang')
+    index = get_vacancy_index()
+    
+    if request.args.get('stream') or request.accept_mimetypes.best == 'application/x-ndjson':
+        # Все найденные вакансии построчно, без сборки общего ответа в памяти
+        def results():
+            for vacancy in index.iter_search(position, skills, lang):
+                yield json.dumps(vacancy, ensure_ascii=False) + '\n'
+        return Response(stream_with_context(results()), mimetype='application/x-ndjson')
+    
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', VACANCY_PAGE_SIZE))
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'Некорректные параметры страницы'
+        }), 400
+    
+    vacancies, has_more = index.search(position, skills, lang, page, per_page)
+    response = jsonify(vacancies)
+    response.headers['X-Has-More'] = '1' if has_more else '0'
+    return response
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
+    profiler = get_profiler()
     return jsonify({
         'status': 'OK',
         'message': 'Resume Generator API is running',
         'version': '1.0.0',
-        'supported_formats': ['pdf', 'docx']
+        'supported_formats': ['pdf', 'docx'],
+        'iam_token': get_token_manager().stats(),
+        'response_cache': get_response_cache().stats(),
+        'concurrency': get_limiter().stats(),
+        'pdf_renderer': get_pdf_renderer().stats(),
+        'render_cache': get_render_cache().stats(),
+        'templates': get_template_registry().ids(),
+        'ats_profiles': len(get_ats_engine().profiles),
+        'vacancies': get_vacancy_index().stats(),
+        'logging': logging_stats(),
+        'profiler': {'dumped': profiler.dumped} if profiler else None
     })
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     if not os.path.exists(app.config['UPLOAD_FOLDER']):
         os.makedirs(app.config['UPLOAD_FOLDER'])
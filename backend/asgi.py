@@ -0,0 +1,247 @@
+import json
+import time
+import asyncio
+import logging
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from app import app as flask_app, sse_event
+from ai_generator_async import AsyncYandexGPT, generate_resume_async, generate_resume_stream_async
+from concurrency import OverloadedError
+from log_config import log_request, make_request_id
+from metrics import REQUEST_DURATION, REQUESTS_IN_FLIGHT
+
+# ASGI-режим: генерация резюме обслуживается нативно в asyncio, остальные маршруты - через Flask.
+# Запуск: uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+logger = logging.getLogger(__name__)
+
+
+class ThreadedWsgiToAsgiInstance(WsgiToAsgiInstance):
+    # asgiref по умолчанию выполняет WSGI-приложение с thread_sensitive=True, то есть все запросы к Flask
+    # идут по очереди через один поток, а под нагрузкой падают с "CurrentThreadExecutor already quit".
+    # Flask потокобезопасен, поэтому запускаем его в общем пуле потоков
+    run_wsgi_app = sync_to_async(WsgiToAsgiInstance.__dict__['run_wsgi_app'].func, thread_sensitive=False)
+
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        await ThreadedWsgiToAsgiInstance(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+
+class ResumeASGIApp:
+    def __init__(self, wsgi_app):
+        self.wsgi = ThreadedWsgiToAsgi(wsgi_app)
+        self.yagpt = None
+        self.routes = {
+            '/api/generate-resume': self.generate_resume,
+            '/api/generate-resume/stream': self.generate_resume_stream
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+
+        handler = self.routes.get(scope.get('path'))
+        if scope['type'] == 'http' and scope['method'] == 'POST' and handler is not None:
+            await self.handle_logged(handler, scope, receive, send)
+            return
+
+        await self.wsgi(scope, receive, send)
+
+    async def handle_logged(self, handler, scope, receive, send):
+        # Те же JSON-поля в access.log, что и у маршрутов Flask
+        started = time.perf_counter()
+        headers = dict(scope.get('headers') or [])
+        request_id = make_request_id(headers.get(b'x-request-id', b'').decode('latin-1'))
+        fields = {'request_id': request_id, 'method': scope['method'], 'path': scope['path'],
+                  'status': None, 'response_bytes': 0, 'streamed': scope['path'].endswith('/stream')}
+
+        async def logged_send(message):
+            if message['type'] == 'http.response.start':
+                fields['status'] = message['status']
+                message['headers'] = list(message.get('headers', [])) + [(b'x-request-id', request_id.encode('latin-1'))]
+            elif message['type'] == 'http.response.body':
+                fields['response_bytes'] += len(message.get('body', b''))
+            await send(message)
+
+        try:
+            with REQUESTS_IN_FLIGHT.track(endpoint=scope['path']):
+                await handler(scope, receive, logged_send)
+        finally:
+            duration = time.perf_counter() - started
+            fields['duration_ms'] = round(duration * 1000, 1)
+            log_request(fields)
+            REQUEST_DURATION.observe(duration, endpoint=scope['path'], method=scope['method'], status=fields['status'] or 500)
+
+    def get_yagpt(self):
+        if self.yagpt is None:
+            self.yagpt = AsyncYandexGPT()
+        return self.yagpt
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.get_yagpt()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.yagpt is not None:
+                    await self.yagpt.aclose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def generate_resume(self, scope, receive, send):
+        logger.info("Received request to /api/generate-resume")
+        data, error = await self.read_request(scope, receive)
+        if error:
+            await self.send_json(scope, send, 400, error)
+            return
+
+        user_data = data.get('user_data', {})
+        resume_type = data.get('resume_type', 'standard')
+        template = data.get('template')
+        use_cache = not data.get('no_cache', False)
+
+        try:
+            logger.info("Generating %s resume", resume_type)
+            resume_content = await generate_resume_async(self.get_yagpt(), user_data, resume_type,
+                                                          use_cache=use_cache, template=template)
+        except OverloadedError as e:
+            logger.warning("Resume generation rejected: too many requests in progress")
+            await self.send_json(scope, send, 429, {
+                'success': False,
+                'message': 'Сервер перегружен, повторите попытку позже'
+            }, headers=[(b'retry-after', str(e.retry_after).encode())])
+            return
+        except Exception as e:
+            logger.error(f"Error generating resume: {str(e)}", exc_info=True)
+            await self.send_json(scope, send, 500, {
+                'success': False,
+                'message': f'Ошибка при генерации резюме: {str(e)}'
+            })
+            return
+
+        logger.info("Resume generated successfully")
+        await self.send_json(scope, send, 200, {
+            'success': True,
+            'resume': resume_content,
+            'message': 'Резюме успешно сгенерировано'
+        })
+
+    async def generate_resume_stream(self, scope, receive, send):
+        logger.info("Received request to /api/generate-resume/stream")
+        data, error = await self.read_request(scope, receive)
+        if error:
+            await self.send_json(scope, send, 400, error)
+            return
+
+        user_data = data.get('user_data', {})
+        resume_type = data.get('resume_type', 'standard')
+        template = data.get('template')
+        use_cache = not data.get('no_cache', False)
+
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+                *self.cors_headers(scope)
+            ]
+        })
+
+        async def stream():
+            chunks = generate_resume_stream_async(self.get_yagpt(), user_data, resume_type,
+                                                  use_cache=use_cache, template=template)
+            try:
+                async for chunk in chunks:
+                    await self.send_body(send, sse_event({'text': chunk}))
+                await self.send_body(send, sse_event({'success': True, 'message': 'Резюме успешно сгенерировано'}, event='done'))
+                logger.info("Resume streamed successfully")
+            except OverloadedError as e:
+                logger.warning("Resume stream rejected: too many requests in progress")
+                await self.send_body(send, sse_event({
+                    'success': False,
+                    'message': 'Сервер перегружен, повторите попытку позже',
+                    'retry_after': e.retry_after
+                }, event='error'))
+            except Exception as e:
+                logger.error(f"Error streaming resume: {str(e)}", exc_info=True)
+                await self.send_body(send, sse_event({
+                    'success': False,
+                    'message': f'Ошибка при генерации резюме: {str(e)}'
+                }, event='error'))
+            finally:
+                await chunks.aclose()
+
+        async def wait_for_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        stream_task = asyncio.create_task(stream())
+        disconnect_task = asyncio.create_task(wait_for_disconnect())
+        done, pending = await asyncio.wait({stream_task, disconnect_task}, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+
+        if disconnect_task in done:
+            # Клиент закрыл соединение: отмена задачи обрывает запрос к Yandex GPT и освобождает слот
+            logger.info("Client disconnected, cancelling resume generation")
+            return
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+    async def read_request(self, scope, receive):
+        headers = dict(scope.get('headers', []))
+        body = b''
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get('body', b'')
+            more_body = message.get('more_body', False)
+
+        if b'json' not in headers.get(b'content-type', b''):
+            logger.warning("Request does not contain JSON data")
+            return None, {'success': False, 'message': 'Ожидается JSON в теле запроса'}
+
+        try:
+            data = json.loads(body or b'{}')
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            return None, {'success': False, 'message': 'Ожидается JSON в теле запроса'}
+
+        if not data.get('user_data', {}).get('name'):
+            return None, {'success': False, 'message': 'Поле "ФИО" обязательно для заполнения'}
+        return data, None
+
+    def cors_headers(self, scope):
+        origin = dict(scope.get('headers', [])).get(b'origin')
+        if not origin:
+            return []
+        return [
+            (b'access-control-allow-origin', origin),
+            (b'access-control-allow-credentials', b'true'),
+            (b'vary', b'Origin')
+        ]
+
+    async def send_json(self, scope, send, status, payload, headers=()):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                *self.cors_headers(scope),
+                *headers
+            ]
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def send_body(self, send, text):
+        await send({'type': 'http.response.body', 'body': text.encode('utf-8'), 'more_body': True})
+
+
+app = ResumeASGIApp(flask_app)
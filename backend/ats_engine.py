@@ -0,0 +1,253 @@
+import os
+import re
+import logging
+import threading
+import numpy as np
+import yaml
+
+logger = logging.getLogger(__name__)
+
+ATS_PROFILES_PATH = os.getenv('ATS_PROFILES_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'ats_profiles.yaml'))
+
+CORE_WEIGHT = 2.0
+KEYWORD_WEIGHT = 1.0
+KEYWORD_SHARE = 0.7
+SECTION_SHARE = 0.3
+MAX_NGRAM = 3
+TOP_MATCHES = 5
+
+# Дефис разделяет слова: "Python-разработчик" дает Python, "unit-тесты" - биграмму "unit тест"
+TOKEN_RE = re.compile(r'[a-zа-яё0-9][a-zа-яё0-9+#./]*', re.IGNORECASE)
+HEADING_RE = re.compile(r'^\s{0,3}#{1,6}\s+(.+?)\s*#*\s*$', re.MULTILINE)
+CYRILLIC_RE = re.compile(r'[а-я]')
+# Окончания для упрощенного стемминга русских слов, от самых длинных к коротким
+RU_ENDINGS = tuple(sorted((
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими', 'ией', 'ием', 'иям', 'иях',
+    'ия', 'ию', 'ии', 'ие', 'ой', 'ей', 'ий', 'ый', 'ая', 'яя', 'ое', 'ее', 'ые', 'ов', 'ев',
+    'ам', 'ям', 'ах', 'ях', 'ом', 'ем', 'ую', 'юю', 'а', 'я', 'о', 'е', 'ы', 'и', 'у', 'ю', 'ь'
+), key=len, reverse=True))
+
+DEFAULT_SECTIONS = [
+    {'name': 'about', 'title': 'О себе'},
+    {'name': 'experience', 'title': 'Опыт работы'},
+    {'name': 'education', 'title': 'Образование'},
+    {'name': 'skills', 'title': 'Навыки'}
+]
+SECTION_SYNONYMS = {
+    'about': ('о себе', 'обо мне', 'профиль', 'цель', 'summary', 'about', 'profile', 'objective'),
+    'experience': ('опыт', 'где я работал', 'карьера', 'experience', 'employment', 'work history'),
+    'education': ('образование', 'что я изучал', 'обучение', 'education'),
+    'skills': ('навык', 'что я умею', 'компетенци', 'skills', 'technologies'),
+    'achievements': ('достижени', 'проект', 'achievements', 'projects'),
+    'additional_info': ('дополнительн', 'языки', 'хобби', 'additional', 'languages', 'interests'),
+    'publications': ('публикаци', 'publications'),
+    'research': ('исследовательск', 'research'),
+    'teaching': ('преподаватель', 'teaching'),
+    'conferences': ('конференци', 'conferences')
+}
+
+
+def normalize_token(token):
+    token = token.lower().replace('ё', 'е').strip('./')
+    if CYRILLIC_RE.search(token):
+        for ending in RU_ENDINGS:
+            if token.endswith(ending) and len(token) - len(ending) >= 4:
+                return token[:-len(ending)]
+    elif len(token) > 4 and token.endswith('s') and not token.endswith('ss') and '.' not in token:
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    return [token for token in (normalize_token(t) for t in TOKEN_RE.findall(text)) if token]
+
+
+def extract_terms(text):
+    # Словосочетания из нескольких слов ("управление проектами", "REST API") ищем как n-граммы
+    tokens = tokenize(text)
+    terms = set(tokens)
+    for n in range(2, MAX_NGRAM + 1):
+        for i in range(len(tokens) - n + 1):
+            terms.add(' '.join(tokens[i:i + n]))
+    return terms
+
+
+def normalize_phrase(phrase):
+    return ' '.join(tokenize(phrase))
+
+
+class ATSEngine:
+    def __init__(self, profiles):
+        self.profiles = profiles
+        self.vocabulary = {}
+        self.display = []
+        rows = []
+
+        for profile in profiles:
+            row = {}
+            for weight, keywords in ((CORE_WEIGHT, profile.get('core', [])), (KEYWORD_WEIGHT, profile.get('keywords', []))):
+                for keyword in keywords:
+                    # Элемент-список - синонимы (обычно русский и английский вариант): это один столбец,
+                    # иначе резюме на одном языке никогда не покрывало бы профиль полностью
+                    variants = [str(variant) for variant in keyword] if isinstance(keyword, list) else [str(keyword)]
+                    terms = [term for term in (normalize_phrase(variant) for variant in variants) if term]
+                    if not terms:
+                        continue
+                    index = next((self.vocabulary[term] for term in terms if term in self.vocabulary), None)
+                    if index is None:
+                        index = len(self.display)
+                        self.display.append(variants[0])
+                    for term in terms:
+                        self.vocabulary.setdefault(term, index)
+                    row[index] = max(row.get(index, 0.0), weight)
+            rows.append(row)
+
+        # Матрица весов профилей: строка - профиль, столбец - термин словаря
+        self.weights = np.zeros((len(profiles), len(self.display)), dtype=np.float32)
+        for profile_index, row in enumerate(rows):
+            if row:
+                self.weights[profile_index, list(row)] = list(row.values())
+        self.totals = np.maximum(self.weights.sum(axis=1), 1e-9)
+        self.title_terms = [
+            [set(tokenize(str(title))) for title in profile.get('titles', [])]
+            for profile in profiles
+        ]
+        logger.info(f"ATS engine ready: {len(profiles)} profiles, {len(self.display)} terms")
+
+    def vectorize_many(self, texts):
+        matrix = np.zeros((len(texts), len(self.display)), dtype=np.float32)
+        for row, text in enumerate(texts):
+            indices = [self.vocabulary[term] for term in extract_terms(text) if term in self.vocabulary]
+            if indices:
+                matrix[row, indices] = 1.0
+        return matrix
+
+    def coverage(self, matrix):
+        # Доля (с учетом весов) ключевых слов каждого профиля, найденных в каждом резюме: (резюме x профили)
+        return (matrix @ self.weights.T) / self.totals
+
+    def match_profile(self, target_position):
+        if not target_position:
+            return None
+        target = set(tokenize(target_position))
+        best_index, best_overlap = None, 0.0
+        for index, titles in enumerate(self.title_terms):
+            for title in titles:
+                if not title:
+                    continue
+                overlap = len(target & title) / len(title)
+                if overlap > best_overlap:
+                    best_index, best_overlap = index, overlap
+        return best_index if best_overlap >= 0.5 else None
+
+    def check(self, resume, target_position=None, sections=None, lang='ru'):
+        return self.check_many([resume], [target_position], sections, lang)[0]
+
+    def check_many(self, resumes, target_positions=None, sections=None, lang='ru'):
+        target_positions = target_positions or [None] * len(resumes)
+        sections = sections or DEFAULT_SECTIONS
+        matrix = self.vectorize_many(resumes)
+        scores = self.coverage(matrix)
+
+        results = []
+        for row, resume in enumerate(resumes):
+            profile_index = self.match_profile(target_positions[row])
+            if profile_index is None and len(self.profiles):
+                profile_index = int(np.argmax(scores[row]))
+            results.append(self._result(resume, matrix[row], scores[row], profile_index, sections, lang))
+        return results
+
+    def _result(self, resume, vector, scores, profile_index, sections, lang):
+        found_sections, missing_sections = check_sections(resume, sections)
+        section_coverage = len(found_sections) / len(sections) if sections else 1.0
+
+        if profile_index is not None:
+            profile_weights = self.weights[profile_index]
+            keyword_coverage = float(scores[profile_index])
+            found = np.flatnonzero((profile_weights > 0) & (vector > 0))
+            # Сначала недостающие ключевые навыки (core), затем остальные
+            missing = np.flatnonzero((profile_weights > 0) & (vector == 0))
+            missing = missing[np.argsort(-profile_weights[missing], kind='stable')]
+            profile = self.profiles[profile_index]
+        else:
+            keyword_coverage = 0.0
+            found = np.flatnonzero(vector > 0)
+            missing = np.array([], dtype=int)
+            profile = None
+
+        score = round(100 * (KEYWORD_SHARE * keyword_coverage + SECTION_SHARE * section_coverage))
+        top = np.argsort(-scores, kind='stable')[:TOP_MATCHES]
+
+        return {
+            'success': True,
+            'score': int(score),
+            'profile': {'id': profile['id'], 'title': profile['titles'][0]} if profile else None,
+            'keywords': [self.display[i] for i in found],
+            'missing_keywords': [self.display[i] for i in missing],
+            'sections': {
+                'found': [section['title'] for section in found_sections],
+                'missing': [section['title'] for section in missing_sections]
+            },
+            'matches': [
+                {'id': self.profiles[i]['id'], 'title': self.profiles[i]['titles'][0], 'score': round(float(scores[i]) * 100)}
+                for i in top if scores[i] > 0
+            ],
+            'suggestions': make_suggestions(resume, [self.display[i] for i in missing], missing_sections, lang)
+        }
+
+
+def check_sections(resume, sections):
+    headings = [heading.lower().replace('ё', 'е') for heading in HEADING_RE.findall(resume)]
+    found, missing = [], []
+    for section in sections:
+        variants = SECTION_SYNONYMS.get(section['name'], ()) + (section['title'].lower().replace('ё', 'е'),)
+        if any(variant in heading for heading in headings for variant in variants):
+            found.append(section)
+        else:
+            missing.append(section)
+    return found, missing
+
+
+def make_suggestions(resume, missing_keywords, missing_sections, lang='ru'):
+    english = lang == 'en'
+    suggestions = []
+    if missing_keywords:
+        keywords = ', '.join(missing_keywords[:5])
+        suggestions.append(
+            f"Add relevant keywords if they match your experience: {keywords}" if english
+            else f"Добавьте ключевые слова, если они соответствуют вашему опыту: {keywords}"
+        )
+    for section in missing_sections:
+        suggestions.append(
+            f"Add a section \"{section['title']}\"" if english
+            else f"Добавьте раздел «{section['title']}»"
+        )
+    if not re.search(r'\d+\s*%|\d{2,}', resume):
+        suggestions.append(
+            "Quantify your achievements with numbers and percentages" if english
+            else "Добавьте в достижения конкретные цифры и проценты"
+        )
+    return suggestions
+
+
+def load_profiles(path=ATS_PROFILES_PATH):
+    with open(path, encoding='utf-8') as f:
+        data = yaml.safe_load(f) or {}
+    profiles = data.get('profiles') or []
+    for profile in profiles:
+        if not profile.get('id') or not profile.get('titles'):
+            raise ValueError(f"{path}: every ATS profile needs 'id' and 'titles'")
+    return profiles
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_ats_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = ATSEngine(load_profiles())
+    return _engine
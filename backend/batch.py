@@ -0,0 +1,172 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from ai_generator import generate_resume
+from log_config import setup_logging
+
+logger = logging.getLogger(__name__)
+
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', 4))
+BATCH_RATE_LIMIT = float(os.getenv('BATCH_RATE_LIMIT', 2))
+BATCH_MAX_RECORDS = int(os.getenv('BATCH_MAX_RECORDS', 1000))
+
+
+class RateLimiter:
+    def __init__(self, rate):
+        # rate - запросов в секунду; 0 отключает ограничение
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def normalize_record(record, index, default_resume_type='standard', default_template=None):
+    # Некорректная запись не должна обрывать весь пакет: ValueError превращается в ошибку этой записи
+    if not isinstance(record, dict):
+        raise ValueError('Запись должна быть объектом с данными пользователя')
+    if 'user_data' in record:
+        if not isinstance(record['user_data'], dict):
+            raise ValueError('Поле "user_data" должно быть объектом')
+        return {
+            'id': str(record.get('id', index)),
+            'user_data': record['user_data'],
+            'resume_type': record.get('resume_type', default_resume_type),
+            'template': record.get('template', default_template)
+        }
+    return {
+        'id': str(record.get('id', index)),
+        'user_data': record,
+        'resume_type': default_resume_type,
+        'template': default_template
+    }
+
+
+def process_record(record, rate_limiter, use_cache=True):
+    started = time.monotonic()
+    if not record['user_data'].get('name'):
+        return {
+            'id': record['id'],
+            'success': False,
+            'message': 'Поле "ФИО" обязательно для заполнения'
+        }
+
+    rate_limiter.acquire()
+    try:
+        resume = generate_resume(record['user_data'], record['resume_type'], use_cache=use_cache,
+                                 template=record['template'])
+    except Exception as e:
+        logger.error(f"Batch item {record['id']} failed: {str(e)}")
+        return {
+            'id': record['id'],
+            'success': False,
+            'message': f'Ошибка при генерации резюме: {str(e)}',
+            'duration': round(time.monotonic() - started, 3)
+        }
+    return {
+        'id': record['id'],
+        'success': True,
+        'resume': resume,
+        'duration': round(time.monotonic() - started, 3)
+    }
+
+
+def run_batch(records, workers=BATCH_WORKERS, rate_limit=BATCH_RATE_LIMIT, completed_ids=(),
+              default_resume_type='standard', use_cache=True, default_template=None):
+    # Результаты отдаются по мере готовности; в работе держим не больше 2 * workers записей,
+    # чтобы большой входной файл не превращался в очередь из тысяч futures
+    completed_ids = set(completed_ids)
+    rate_limiter = RateLimiter(rate_limit)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch')
+    pending = set()
+    try:
+        for index, raw in enumerate(records):
+            try:
+                record = normalize_record(raw, index, default_resume_type, default_template)
+            except ValueError as e:
+                record_id = str(raw.get('id', index)) if isinstance(raw, dict) else str(index)
+                if record_id not in completed_ids:
+                    yield {'id': record_id, 'success': False, 'message': str(e)}
+                continue
+            if record['id'] in completed_ids:
+                continue
+            pending.add(executor.submit(process_record, record, rate_limiter, use_cache))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        # При разрыве соединения или Ctrl+C не запускаем оставшиеся записи
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_completed_ids(path):
+    if not os.path.exists(path):
+        return set()
+    return {str(item['id']) for item in read_jsonl(path) if item.get('success')}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Пакетная генерация резюме из JSONL-файла')
+    parser.add_argument('input', help='JSONL-файл: по одной записи user_data (или {"id", "user_data", "resume_type", "template"}) на строку')
+    parser.add_argument('-o', '--output', required=True, help='JSONL-файл с результатами; при повторном запуске готовые записи пропускаются')
+    parser.add_argument('-w', '--workers', type=int, default=BATCH_WORKERS, help='число параллельных генераций')
+    parser.add_argument('-r', '--rate', type=float, default=BATCH_RATE_LIMIT, help='максимум запросов к Yandex GPT в секунду (0 - без ограничения)')
+    parser.add_argument('-t', '--resume-type', default='standard', help='тип резюме по умолчанию')
+    parser.add_argument('--template', help='шаблон оформления по умолчанию (id из templates/*.yaml)')
+    parser.add_argument('--no-cache', action='store_true', help='не использовать кэш ответов')
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error('--workers должно быть положительным числом')
+
+    completed_ids = read_completed_ids(args.output)
+    if completed_ids:
+        logger.info(f"Resuming batch: {len(completed_ids)} records already done")
+
+    started = time.monotonic()
+    succeeded = failed = 0
+    with open(args.output, 'a', encoding='utf-8') as out:
+        for result in run_batch(read_jsonl(args.input), args.workers, args.rate, completed_ids,
+                                args.resume_type, use_cache=not args.no_cache, default_template=args.template):
+            out.write(json.dumps(result, ensure_ascii=False) + '\n')
+            out.flush()
+            if result['success']:
+                succeeded += 1
+            else:
+                failed += 1
+
+    elapsed = time.monotonic() - started
+    per_minute = (succeeded + failed) / elapsed * 60 if elapsed else 0
+    logger.info(f"Batch finished: {succeeded} succeeded, {failed} failed, {per_minute:.1f} records/min")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    setup_logging()
+    sys.exit(main())
@@ -0,0 +1,323 @@
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+from mock_yandex import PROFILES, start_mock_server, mock_env
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', 'api_baseline.json')
+SCENARIOS = ('generate', 'download-pdf', 'download-docx')
+STARTUP_TIMEOUT = 60
+RSS_SAMPLE_INTERVAL = 0.05
+
+USER_DATA = {
+    'name': 'Иван Иванов',
+    'email': 'ivan@example.com',
+    'phone': '+7 900 000-00-00',
+    'target_position': 'Python-разработчик',
+    'about': 'Backend-разработчик с опытом высоконагруженных сервисов',
+    'experience': 'ООО «Компания», 2019–2024: разработка REST API на Flask, PostgreSQL, Docker',
+    'education': 'МГУ, факультет ВМК, 2018',
+    'skills': ['Python', 'Flask', 'PostgreSQL', 'Docker', 'Git']
+}
+
+RESUME_MARKDOWN = """# Иван Иванов
+**Email:** ivan@example.com | **Телефон:** +7 900 000-00-00
+
+## О себе
+Backend-разработчик с опытом высоконагруженных сервисов.
+
+## Опыт работы
+### ООО «Компания» (2019–2024)
+- Сократил время ответа API на 40%
+- Руководил командой из *5 человек*
+- Перевел сервисы на `Docker` и Kubernetes
+
+## Образование
+МГУ, факультет ВМК, 2018
+
+## Навыки
+| Навык | Уровень |
+|-------|---------|
+| Python | Эксперт |
+| PostgreSQL | Продвинутый |
+"""
+
+
+def percentile(sorted_values, percent):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(percent / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def read_rss(pid):
+    # Linux: текущий объем резидентной памяти процесса backend, байт
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+class RSSSampler:
+    def __init__(self, pid, interval=RSS_SAMPLE_INTERVAL):
+        self.pid = pid
+        self.interval = interval
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = read_rss(self.pid)
+            if rss is not None:
+                self.peak = max(self.peak or 0, rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        if self.pid:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+def start_backend(server, port, env):
+    if server == 'asgi':
+        command = [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(port),
+                   '--log-level', 'warning']
+    else:
+        command = [sys.executable, 'app.py']
+    stderr_path = os.path.join(env['LOG_DIR'], 'backend.stderr')
+    with open(stderr_path, 'wb') as stderr:
+        process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=stderr)
+
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            with open(stderr_path, encoding='utf-8', errors='replace') as f:
+                tail = f.read()[-2000:]
+            raise RuntimeError(f'backend exited with code {process.returncode}:\n{tail}')
+        try:
+            requests.get(base_url + '/api/health', timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f'backend did not start within {STARTUP_TIMEOUT}s')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def make_request(scenario, index, use_cache):
+    # Без --use-cache каждый запрос уникален, иначе замер показал бы скорость кэшей, а не генерации и рендеринга
+    if scenario == 'generate':
+        user_data = dict(USER_DATA, name=USER_DATA['name'] if use_cache else f"{USER_DATA['name']} {index}")
+        return '/api/generate-resume', {'user_data': user_data, 'no_cache': not use_cache}
+    content = RESUME_MARKDOWN if use_cache else f"{RESUME_MARKDOWN}\nВерсия {index}\n"
+    return '/api/download-resume', {
+        'resume_content': content,
+        'format': scenario.split('-')[1],
+        'template': 'modern'
+    }
+
+
+def run_scenario(base_url, scenario, total, concurrency, warmup, use_cache, pid):
+    local = threading.local()
+
+    def call(index):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        path, payload = make_request(scenario, index, use_cache)
+        started = time.perf_counter()
+        try:
+            response = session.post(base_url + path, json=payload, timeout=120)
+            status = response.status_code
+        except requests.RequestException:
+            status = 'connection error'
+        return time.perf_counter() - started, status
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(call, range(-warmup, 0)))
+        with RSSSampler(pid) as sampler:
+            started = time.perf_counter()
+            results = list(executor.map(call, range(total)))
+            elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, status in results if status == 200)
+    statuses = Counter(str(status) for _, status in results if status != 200)
+    return {
+        'requests': total,
+        'errors': sum(statuses.values()),
+        'error_statuses': dict(statuses),
+        'rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': ms(percentile(latencies, 50)),
+        'p95_ms': ms(percentile(latencies, 95)),
+        'p99_ms': ms(percentile(latencies, 99)),
+        'peak_rss_mb': round(sampler.peak / 1024 / 1024, 1) if sampler.peak else None
+    }
+
+
+def ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for scenario, current in results.items():
+        previous = baseline.get('results', {}).get(scenario)
+        if not previous:
+            continue
+        if previous.get('p95_ms') and current.get('p95_ms') and current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{scenario}: p95 {previous['p95_ms']} -> {current['p95_ms']} ms")
+        if previous.get('rps') and current['rps'] < previous['rps'] * (1 - tolerance):
+            regressions.append(f"{scenario}: rps {previous['rps']} -> {current['rps']}")
+        if previous.get('peak_rss_mb') and current.get('peak_rss_mb') and \
+                current['peak_rss_mb'] > previous['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(f"{scenario}: peak RSS {previous['peak_rss_mb']} -> {current['peak_rss_mb']} MB")
+        if current['errors'] > previous.get('errors', 0) + tolerance * current['requests']:
+            regressions.append(f"{scenario}: errors {previous.get('errors', 0)} -> {current['errors']}")
+    return regressions
+
+
+def print_results(results):
+    print(f"{'scenario':<16}{'requests':>10}{'errors':>8}{'rps':>10}{'p50, ms':>10}{'p95, ms':>10}"
+          f"{'p99, ms':>10}{'peak RSS, MB':>14}")
+    for scenario, result in results.items():
+        print(f"{scenario:<16}{result['requests']:>10}{result['errors']:>8}{result['rps']:>10}"
+              f"{str(result['p50_ms']):>10}{str(result['p95_ms']):>10}{str(result['p99_ms']):>10}"
+              f"{str(result['peak_rss_mb']):>14}")
+        if result['error_statuses']:
+            print(f"{'':<16}errors by status: {result['error_statuses']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Нагрузочный тест API генерации и скачивания резюме на локальном mock Yandex GPT')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f'через запятую: {", ".join(SCENARIOS)}')
+    parser.add_argument('-n', '--requests', type=int, default=200, help='запросов на сценарий')
+    parser.add_argument('-c', '--concurrency', type=int, default=8, help='одновременных клиентов')
+    parser.add_argument('--warmup', type=int, default=5, help='прогревочных запросов на сценарий (не учитываются)')
+    parser.add_argument('--server', choices=('flask', 'asgi'), default='flask', help='как запускать backend')
+    parser.add_argument('--url', help='адрес уже запущенного backend; тогда mock и backend не запускаются')
+    parser.add_argument('--pid', type=int, help='PID уже запущенного backend для замера памяти')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='fast', help='профиль задержек и ошибок mock')
+    parser.add_argument('--latency', type=float, help='средняя задержка mock, сек')
+    parser.add_argument('--error-rate', type=float, help='доля ответов 429/500/503 от mock')
+    parser.add_argument('--unauthorized-rate', type=float, help='доля ответов 401 от mock')
+    parser.add_argument('--service-account', action='store_true',
+                        help='получать IAM-токены у mock по ключу сервисного аккаунта из окружения (нужен cryptography)')
+    parser.add_argument('--use-cache', action='store_true', help='повторять одинаковые запросы, чтобы мерить кэши')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='JSON с базовыми результатами')
+    parser.add_argument('--save-baseline', action='store_true', help='сохранить результаты как новую базу')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='допустимое ухудшение относительно базы (0.2 = 20%%)')
+    args = parser.parse_args(argv)
+
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(',') if scenario.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    mock = process = work_dir = None
+    try:
+        if args.url:
+            base_url, pid = args.url.rstrip('/'), args.pid
+        else:
+            mock = start_mock_server(profile=args.profile, latency=args.latency,
+                                     error_rate=args.error_rate, unauthorized_rate=args.unauthorized_rate)
+            work_dir = tempfile.mkdtemp(prefix='resume-bench-')
+            port = free_port()
+            env = dict(os.environ, **mock_env(mock))
+            env.update({
+                'FLASK_HOST': '127.0.0.1',
+                'FLASK_PORT': str(port),
+                'FLASK_DEBUG': 'false',
+                'LOG_DIR': work_dir,
+                'VACANCY_DB': os.path.join(work_dir, 'vacancies.db')
+            })
+            env['YC_FOLDER_ID'] = 'mock-folder'
+            if not args.service_account:
+                # Пустые значения не дают load_dotenv подставить ключ сервисного аккаунта из .env
+                env.update({'YC_IAM_TOKEN': 'mock-static-token', 'YC_SERVICE_ACCOUNT_ID': '',
+                            'YC_ACCESS_KEY_ID': '', 'YC_PRIVATE_KEY': ''})
+            process, base_url = start_backend(args.server, port, env)
+            pid = process.pid
+
+        results = {}
+        for scenario in scenarios:
+            results[scenario] = run_scenario(base_url, scenario, args.requests, args.concurrency,
+                                             args.warmup, args.use_cache, pid)
+        if mock is not None:
+            print(f"mock counters: {mock.state.counters}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+        if mock is not None:
+            mock.shutdown()
+        if work_dir is not None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_results(results)
+
+    report = {
+        'config': {
+            'server': 'external' if args.url else args.server,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'profile': args.profile,
+            'use_cache': args.use_cache,
+            'service_account': args.service_account,
+            'python': platform.python_version()
+        },
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results
+    }
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('config', {}) | {'python': None} != report['config'] | {'python': None}:
+            print(f"warning: baseline was recorded with different settings: {baseline.get('config')}")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print('REGRESSIONS:')
+            for line in regressions:
+                print(f'  {line}')
+            return 1
+        print(f"no regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
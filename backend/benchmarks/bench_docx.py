@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import argparse
+import statistics
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx_converter import markdown_to_docx
+
+
+def make_resume(sections):
+    parts = ["# Иван Иванов", "**Email:** ivan@example.com | **Телефон:** +7 900 000-00-00", ""]
+    for index in range(sections):
+        parts += [
+            f"## Опыт работы {index + 1}",
+            f"### ООО «Компания {index + 1}» (2019–2023)",
+            "Руководил командой из *8 человек*, отвечал за `CI/CD` и **архитектуру** сервисов.",
+            "",
+            "- Сократил время сборки на 40%",
+            "- Внедрил мониторинг и алерты",
+            "    - Prometheus, Grafana",
+            "    - SLO 99.9%",
+            "- Провел миграцию на Kubernetes",
+            "",
+            "| Навык | Уровень |",
+            "|-------|---------|",
+            "| Python | Эксперт |",
+            "| SQL | Продвинутый |",
+            ""
+        ]
+    return "\n".join(parts)
+
+
+def measure(func, *args, runs=5):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(timings), peak
+
+
+def convert_batch(resumes):
+    for resume in resumes:
+        markdown_to_docx(resume)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Бенчмарк конвертации Markdown в DOCX')
+    parser.add_argument('--sizes', default='5,50,200', help='число разделов опыта в резюме, через запятую')
+    parser.add_argument('--batch', type=int, default=50, help='число резюме в пакетном прогоне')
+    parser.add_argument('--runs', type=int, default=5, help='повторов на замер')
+    args = parser.parse_args(argv)
+
+    print(f"{'case':<24}{'markdown, KB':>14}{'median, ms':>14}{'peak mem, MB':>16}")
+    for sections in (int(size) for size in args.sizes.split(',')):
+        resume = make_resume(sections)
+        elapsed, peak = measure(markdown_to_docx, resume, runs=args.runs)
+        print(f"{f'single, {sections} sections':<24}{len(resume.encode()) / 1024:>14.1f}"
+              f"{elapsed * 1000:>14.1f}{peak / 1024 / 1024:>16.2f}")
+
+    resumes = [make_resume(5) for _ in range(args.batch)]
+    elapsed, peak = measure(convert_batch, resumes, runs=max(1, args.runs // 2))
+    print(f"{f'batch x{args.batch}, 5 sections':<24}{sum(len(r.encode()) for r in resumes) / 1024:>14.1f}"
+          f"{elapsed * 1000:>14.1f}{peak / 1024 / 1024:>16.2f}")
+    print(f"batch throughput: {args.batch / elapsed:.1f} documents/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Локальная замена Yandex Cloud для нагрузочного тестирования: выдает IAM-токены и ответы
+# foundationModels/v1/completion с настраиваемой задержкой, долей ошибок и ответов 401.
+# Backend направляется на mock переменными YANDEX_GPT_API_URL и YC_IAM_TOKEN_URL.
+
+COMPLETION_PATH = '/foundationModels/v1/completion'
+IAM_PATH = '/iam/v1/tokens'
+
+PROFILES = {
+    # задержка ответа (среднее и разброс), доля ошибок 5xx/429, доля ответов 401
+    'fast': {'latency': 0.05, 'jitter': 0.01, 'error_rate': 0.0, 'unauthorized_rate': 0.0},
+    'realistic': {'latency': 2.0, 'jitter': 0.5, 'error_rate': 0.01, 'unauthorized_rate': 0.0},
+    'flaky': {'latency': 1.0, 'jitter': 0.5, 'error_rate': 0.1, 'unauthorized_rate': 0.05}
+}
+ERROR_STATUSES = (429, 500, 503)
+STREAM_CHUNKS = 8
+
+RESUME_TEMPLATE = """# {name}
+
+## О себе
+Опытный специалист с многолетним стажем, ориентированный на результат.
+
+## Опыт работы
+### ООО «Компания» (2019–2024)
+- Сократил время обработки заказов на 35%
+- Руководил командой из 6 человек
+- Внедрил автоматизированное тестирование
+
+## Образование
+Московский государственный университет, 2018
+
+## Навыки
+Python, SQL, Docker, Git, REST API
+"""
+
+
+class MockState:
+    def __init__(self, latency, jitter, error_rate, unauthorized_rate, token_ttl=3600):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.unauthorized_rate = unauthorized_rate
+        self.token_ttl = token_ttl
+        self.counters = {'completions': 0, 'streams': 0, 'tokens': 0, 'errors': 0, 'unauthorized': 0}
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+            return self.counters[name]
+
+    def delay(self):
+        return max(0.0, random.gauss(self.latency, self.jitter))
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.path == IAM_PATH:
+            self.issue_token()
+        elif self.path == COMPLETION_PATH:
+            self.complete(body)
+        else:
+            self.send_json(404, {'message': 'Not found'})
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def issue_token(self):
+        number = self.state.count('tokens')
+        expires_at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=self.state.token_ttl)
+        # Как Yandex Cloud: RFC 3339 в UTC с суффиксом Z, а не isoformat() с +00:00
+        self.send_json(200, {'iamToken': f'mock-iam-token-{number}', 'expiresAt': expires_at.strftime('%Y-%m-%dT%H:%M:%S.%fZ')})
+
+    def complete(self, body):
+        state = self.state
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            state.count('unauthorized')
+            self.send_json(401, {'message': 'Unauthenticated'})
+            return
+        if random.random() < state.unauthorized_rate:
+            state.count('unauthorized')
+            self.send_json(401, {'message': 'The token is invalid'})
+            return
+
+        time.sleep(state.delay())
+        if random.random() < state.error_rate:
+            state.count('errors')
+            self.send_json(random.choice(ERROR_STATUSES), {'message': 'Injected error'})
+            return
+
+        try:
+            data = json.loads(body)
+        except ValueError:
+            self.send_json(400, {'message': 'Invalid JSON'})
+            return
+        text = RESUME_TEMPLATE.format(name=f"Кандидат {state.count('completions')}")
+
+        if (data.get('completionOptions') or {}).get('stream'):
+            state.count('streams')
+            self.stream(text)
+        else:
+            self.send_json(200, completion_result(text, 'ALTERNATIVE_STATUS_FINAL'))
+
+    def stream(self, text):
+        # Как и Yandex GPT, в потоке каждая строка NDJSON содержит весь текст, сгенерированный к этому моменту
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        step = max(1, len(text) // STREAM_CHUNKS)
+        for end in list(range(step, len(text), step)) + [len(text)]:
+            status = 'ALTERNATIVE_STATUS_FINAL' if end == len(text) else 'ALTERNATIVE_STATUS_PARTIAL'
+            line = (json.dumps(completion_result(text[:end], status), ensure_ascii=False) + '\n').encode('utf-8')
+            self.wfile.write(f'{len(line):X}\r\n'.encode() + line + b'\r\n')
+        self.wfile.write(b'0\r\n\r\n')
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def completion_result(text, status):
+    return {
+        'result': {
+            'alternatives': [{'message': {'role': 'assistant', 'text': text}, 'status': status}],
+            'usage': {'inputTextTokens': '500', 'completionTokens': str(len(text) // 4), 'totalTokens': str(500 + len(text) // 4)},
+            'modelVersion': 'mock'
+        }
+    }
+
+
+def start_mock_server(host='127.0.0.1', port=0, profile='fast', **overrides):
+    settings = dict(PROFILES[profile])
+    settings.update({key: value for key, value in overrides.items() if value is not None})
+    server = ThreadingHTTPServer((host, port), MockHandler)
+    server.daemon_threads = True
+    server.state = MockState(**settings)
+    threading.Thread(target=server.serve_forever, name='mock-yandex', daemon=True).start()
+    return server
+
+
+def mock_env(server):
+    host, port = server.server_address[:2]
+    base = f'http://{host}:{port}'
+    return {
+        'YANDEX_GPT_API_URL': base + COMPLETION_PATH,
+        'YC_IAM_TOKEN_URL': base + IAM_PATH
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Локальный mock Yandex GPT и IAM для нагрузочного тестирования')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='fast', help='набор задержек и ошибок')
+    parser.add_argument('--latency', type=float, help='средняя задержка ответа, сек')
+    parser.add_argument('--jitter', type=float, help='стандартное отклонение задержки, сек')
+    parser.add_argument('--error-rate', type=float, help='доля ответов 429/500/503')
+    parser.add_argument('--unauthorized-rate', type=float, help='доля ответов 401 (проверка обновления IAM-токена)')
+    args = parser.parse_args(argv)
+
+    server = start_mock_server(args.host, args.port, args.profile, latency=args.latency, jitter=args.jitter,
+                               error_rate=args.error_rate, unauthorized_rate=args.unauthorized_rate)
+    for name, value in mock_env(server).items():
+        print(f'{name}={value}')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(json.dumps(server.state.counters))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import os
+import asyncio
+import threading
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+
+GENERATION_CONCURRENCY = int(os.getenv('GENERATION_CONCURRENCY', 8))
+GENERATION_MAX_QUEUE = int(os.getenv('GENERATION_MAX_QUEUE', 100))
+GENERATION_QUEUE_TIMEOUT = float(os.getenv('GENERATION_QUEUE_TIMEOUT', 30))
+GENERATION_RETRY_AFTER = int(os.getenv('GENERATION_RETRY_AFTER', 5))
+
+
+class OverloadedError(Exception):
+    def __init__(self, retry_after=GENERATION_RETRY_AFTER):
+        super().__init__("Too many resume generations in progress")
+        self.retry_after = retry_after
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class ConcurrencyLimiter:
+    # Один бюджет на процесс: в режиме ASGI его делят нативные async-маршруты (aslot) и маршруты Flask,
+    # работающие в потоках (slot), поэтому одновременных запросов к Yandex GPT не больше limit
+    def __init__(self, limit=GENERATION_CONCURRENCY, max_queue=GENERATION_MAX_QUEUE,
+                 queue_timeout=GENERATION_QUEUE_TIMEOUT):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._async_waiters = deque()
+        self._waiting = 0
+        self._active = 0
+        self._rejected = 0
+
+    def _enter_queue(self):
+        if self._waiting >= self.max_queue:
+            self._rejected += 1
+            raise OverloadedError()
+        self._waiting += 1
+
+    def _wake_async(self):
+        while self._async_waiters:
+            loop, future = self._async_waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+                return
+            except RuntimeError:
+                # Цикл событий уже закрыт
+                continue
+
+    def _release(self):
+        with self._cond:
+            self._active -= 1
+            # Будим по одному ожидающему каждого вида; кто не успел занять слот, ждет дальше
+            self._cond.notify()
+            self._wake_async()
+
+    @contextmanager
+    def slot(self):
+        with self._cond:
+            self._enter_queue()
+            try:
+                acquired = self._cond.wait_for(lambda: self._active < self.limit, timeout=self.queue_timeout)
+            finally:
+                self._waiting -= 1
+            if not acquired:
+                self._rejected += 1
+                raise OverloadedError()
+            self._active += 1
+        try:
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def aslot(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.queue_timeout
+        with self._cond:
+            self._enter_queue()
+        try:
+            while True:
+                with self._cond:
+                    if self._active < self.limit:
+                        self._active += 1
+                        break
+                    future = loop.create_future()
+                    self._async_waiters.append((loop, future))
+                try:
+                    await asyncio.wait_for(future, max(0, deadline - loop.time()))
+                except BaseException:
+                    with self._cond:
+                        try:
+                            self._async_waiters.remove((loop, future))
+                        except ValueError:
+                            # Нас уже разбудили: передаем освободившийся слот следующему ожидающему
+                            self._cond.notify()
+                            self._wake_async()
+                    raise
+        except asyncio.TimeoutError:
+            with self._cond:
+                self._rejected += 1
+            raise OverloadedError()
+        finally:
+            with self._cond:
+                self._waiting -= 1
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self):
+        return {
+            'limit': self.limit,
+            'active': self._active,
+            'waiting': self._waiting,
+            'rejected': self._rejected
+        }
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = ConcurrencyLimiter()
+    return _limiter
@@ -0,0 +1,181 @@
+import io
+import re
+import html
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from markdown.util import AMP_SUBSTITUTE, STX, ETX
+from markdown_parser import markdown_to_tree
+from metrics import stage
+
+HEADINGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+LIST_STYLES = {'ul': 'List Bullet', 'ol': 'List Number'}
+# В стандартном шаблоне python-docx есть стили списков до третьего уровня вложенности
+MAX_LIST_LEVEL = 3
+BLOCK_TAGS = {'p', 'ul', 'ol', 'pre', 'blockquote', 'table', 'hr'} | set(HEADINGS)
+CODE_FONT = 'Courier New'
+HTML_PLACEHOLDER_RE = re.compile(STX + r'wzxhzdk:(\d+)' + ETX)
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+
+
+class DocxConverter:
+    def __init__(self, markdown_text, template=None):
+        self.root, self.raw_html = markdown_to_tree(markdown_text)
+        self.template = template
+        self.doc = None
+        self._styles = {}
+
+    def _apply_template(self, styles):
+        normal = self.doc.styles['Normal']
+        normal.font.name = styles['font']
+        normal.paragraph_format.line_spacing = styles['line_spacing']
+        for level in (1, 2):
+            heading = self.doc.styles[f'Heading {level}']
+            heading.font.name = styles['font']
+            heading.font.color.rgb = styles['primary']
+        heading = self.doc.styles['Heading 3']
+        heading.font.name = styles['font']
+        heading.font.color.rgb = styles['secondary']
+
+    def convert(self):
+        # Разбор Markdown учитывается отдельно (стадия markdown_parse), здесь только сборка документа
+        with stage('docx_build'):
+            self.doc = Document()
+            if self.template is not None:
+                self._apply_template(self.template.docx_styles)
+            for element in self.root:
+                self._block(element)
+
+            buffer = io.BytesIO()
+            self.doc.save(buffer)
+            return buffer.getvalue()
+
+    def _style_id(self, name, style_type=WD_STYLE_TYPE.PARAGRAPH):
+        # Присваивание стиля в python-docx каждый раз проходит по всем стилям документа,
+        # чтобы проверить, не стиль ли это по умолчанию; вычисляем id один раз на документ
+        if name not in self._styles:
+            self._styles[name] = self.doc.part.get_style_id(self.doc.styles[name], style_type)
+        return self._styles[name]
+
+    def _paragraph(self, style_name):
+        paragraph = self.doc.add_paragraph()
+        paragraph._p.style = self._style_id(style_name)
+        return paragraph
+
+    def _stashed_html(self, index):
+        block = self.raw_html[index] if index < len(self.raw_html) else ''
+        if not isinstance(block, str):
+            block = ''.join(block.itertext())
+        return block
+
+    def _stashed_text(self, index):
+        return html.unescape(HTML_TAG_RE.sub('', self._stashed_html(index)))
+
+    def _block(self, element, quote=False):
+        tag = element.tag
+        placeholder = HTML_PLACEHOLDER_RE.fullmatch((element.text or '').strip()) if len(element) == 0 else None
+        if placeholder:
+            # Блок кода (fenced_code) или сырой HTML целиком
+            index = int(placeholder.group(1))
+            if self._stashed_html(index).lstrip().startswith('<pre'):
+                self._code_block(self._stashed_text(index))
+            else:
+                self._add_text(self._paragraph('Normal'), self._stashed_text(index), False, False, False)
+        elif tag in HEADINGS:
+            self._inline(self._paragraph(f'Heading {HEADINGS[tag]}'), element)
+        elif tag == 'p':
+            self._inline(self._paragraph('Quote' if quote else 'Normal'), element)
+        elif tag in LIST_STYLES:
+            self._list(element, level=1)
+        elif tag == 'blockquote':
+            for child in element:
+                self._block(child, quote=True)
+        elif tag == 'pre':
+            self._code_block(''.join(element.itertext()))
+        elif tag == 'table':
+            self._table(element)
+        elif tag == 'hr':
+            self._paragraph('Normal')
+        else:
+            self._inline(self._paragraph('Normal'), element)
+
+    def _code_block(self, code):
+        paragraph = self._paragraph('No Spacing')
+        for index, line in enumerate(code.strip('\n').split('\n')):
+            run = paragraph.add_run()
+            if index:
+                run.add_break()
+            run.add_text(line)
+            run.font.name = CODE_FONT
+
+    def _list(self, element, level):
+        base_style = LIST_STYLES[element.tag]
+        depth = min(level, MAX_LIST_LEVEL)
+        style_name = base_style if depth == 1 else f'{base_style} {depth}'
+
+        for item in element:
+            if item.tag != 'li':
+                continue
+            paragraph = self._paragraph(style_name)
+            nested = []
+            self._inline(paragraph, item, stop_at_blocks=nested)
+            for child in nested:
+                if child.tag in LIST_STYLES:
+                    self._list(child, level + 1)
+                elif child.tag == 'p' and not paragraph.runs:
+                    # Свободный список: текст пункта обернут в <p>
+                    self._inline(paragraph, child)
+                else:
+                    self._block(child)
+
+    def _table(self, element):
+        rows = [row for row in element.iter('tr')]
+        if not rows:
+            return
+        columns = max(len(row) for row in rows)
+        table = self.doc.add_table(rows=len(rows), cols=columns)
+        table._tbl.tblStyle_val = self._style_id('Table Grid', WD_STYLE_TYPE.TABLE)
+
+        for row_element, row in zip(rows, table.rows):
+            for cell_element, cell in zip(row_element, row.cells):
+                self._inline(cell.paragraphs[0], cell_element, bold=cell_element.tag == 'th')
+
+    def _inline(self, paragraph, element, bold=False, italic=False, code=False, stop_at_blocks=None):
+        self._add_text(paragraph, element.text, bold, italic, code)
+
+        for child in element:
+            tag = child.tag
+            if stop_at_blocks is not None and tag in BLOCK_TAGS:
+                stop_at_blocks.append(child)
+                continue
+            if tag == 'br':
+                paragraph.add_run().add_break()
+            else:
+                self._inline(
+                    paragraph, child,
+                    bold=bold or tag in ('strong', 'b', 'th'),
+                    italic=italic or tag in ('em', 'i'),
+                    code=code or tag == 'code'
+                )
+            self._add_text(paragraph, child.tail, bold, italic, code)
+
+    def _add_text(self, paragraph, text, bold, italic, code):
+        if not text:
+            return
+        if STX in text:
+            text = HTML_PLACEHOLDER_RE.sub(lambda m: self._stashed_text(int(m.group(1))), text)
+            text = text.replace(AMP_SUBSTITUTE, '&')
+        # Переносы строк внутри абзаца Markdown - это пробелы, а не новые строки
+        text = text.replace('\n', ' ')
+        if not text.strip() and not paragraph.runs:
+            return
+        run = paragraph.add_run(text)
+        if bold:
+            run.bold = True
+        if italic:
+            run.italic = True
+        if code:
+            run.font.name = CODE_FONT
+
+
+def markdown_to_docx(markdown_text, template=None):
+    return DocxConverter(markdown_text, template).convert()
@@ -0,0 +1,105 @@
+import os
+import random
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 5))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 60))
+HTTP_POOL_TIMEOUT = float(os.getenv('HTTP_POOL_TIMEOUT', 30))
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 3))
+HTTP_BACKOFF_BASE = float(os.getenv('HTTP_BACKOFF_BASE', 0.5))
+HTTP_BACKOFF_MAX = float(os.getenv('HTTP_BACKOFF_MAX', 8))
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def backoff_delay(attempt, base=HTTP_BACKOFF_BASE, cap=HTTP_BACKOFF_MAX):
+    # Экспоненциальная задержка с "full jitter", чтобы повторы разных воркеров не совпадали по времени
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class BoundedWaitPoolMixin:
+    # requests не передает pool_timeout в urllib3, и при pool_block=True ожидание свободного соединения
+    # не ограничено: утечка соединений превращается в зависание. Ограничиваем ожидание, по истечении - EmptyPoolError
+    pool_timeout = HTTP_POOL_TIMEOUT
+
+    def _get_conn(self, timeout=None):
+        return super()._get_conn(timeout=self.pool_timeout if timeout is None else timeout)
+
+
+class BoundedHTTPConnectionPool(BoundedWaitPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class BoundedHTTPSConnectionPool(BoundedWaitPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class BoundedPoolAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': BoundedHTTPConnectionPool,
+            'https': BoundedHTTPSConnectionPool
+        }
+
+
+class HttpClient:
+    def __init__(self, pool_size=HTTP_POOL_SIZE, connect_timeout=HTTP_CONNECT_TIMEOUT,
+                 read_timeout=HTTP_READ_TIMEOUT, max_retries=HTTP_MAX_RETRIES):
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.session = self._create_session()
+
+    def _create_session(self):
+        # Адаптер сам ничего не повторяет: все повторы (включая ошибки соединения) делает вызывающий код
+        # с backoff_delay. Повторы на двух уровнях перемножались: max_retries попыток _post по max_retries
+        # попыток соединения каждая, и все это время запрос занимал слот генерации
+        retry = Retry(total=0, raise_on_status=False)
+        adapter = BoundedPoolAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=retry,
+            pool_block=True
+        )
+
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'Connection': 'keep-alive'})
+        return session
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+                logger.info(f"HTTP client initialized (pool size {_client.pool_size}, timeout {_client.timeout})")
+    return _client
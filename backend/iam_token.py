@@ -0,0 +1,164 @@
+import os
+import time
+import logging
+import datetime
+import threading
+import jwt
+from http_client import get_http_client
+from metrics import stage, UPSTREAM_ERRORS
+
+logger = logging.getLogger(__name__)
+
+# Адреса API переопределяются, чтобы направить backend на локальный mock (benchmarks/mock_yandex.py)
+IAM_TOKEN_URL = os.getenv('YC_IAM_TOKEN_URL', "https://iam.api.cloud.yandex.net/iam/v1/tokens")
+
+# IAM-токены Yandex Cloud живут до 12 часов, но обновлять их рекомендуется не реже раза в час
+DEFAULT_TOKEN_TTL = 3600
+REFRESH_MARGIN = int(os.getenv('YC_IAM_REFRESH_MARGIN', 300))
+# После неудачного обновления фоновые попытки приостанавливаются, чтобы при сбое IAM не слать запрос на каждый вызов
+REFRESH_BACKOFF = float(os.getenv('YC_IAM_REFRESH_BACKOFF', 30))
+
+
+class IAMTokenManager:
+    def __init__(self, token_url=IAM_TOKEN_URL, refresh_margin=REFRESH_MARGIN, refresh_backoff=REFRESH_BACKOFF):
+        self.token_url = token_url
+        self.refresh_margin = refresh_margin
+        self.refresh_backoff = refresh_backoff
+        self.static_token = os.getenv('YC_IAM_TOKEN')
+        self.service_account_id = os.getenv('YC_SERVICE_ACCOUNT_ID')
+        self.key_id = os.getenv('YC_ACCESS_KEY_ID')
+        self.private_key = (os.getenv('YC_PRIVATE_KEY') or '').replace('\\n', '\n')
+
+        self._token = None
+        self._expires_at = 0.0
+        self._failed_at = None
+        self._lock = threading.Lock()
+        self._background_guard = threading.Lock()
+        self._stats = {'hits': 0, 'refreshes': 0, 'background_refreshes': 0, 'failures': 0}
+
+    @property
+    def has_service_account(self):
+        return all([self.service_account_id, self.key_id, self.private_key])
+
+    def get_token(self):
+        if not self.has_service_account:
+            return self.static_token
+
+        now = time.time()
+        token, expires_at = self._token, self._expires_at
+
+        if token and now < expires_at - self.refresh_margin:
+            self._stats['hits'] += 1
+            return token
+
+        if token and now < expires_at:
+            # Токен еще действителен: отдаем его и обновляем в фоне
+            self._stats['hits'] += 1
+            self._start_background_refresh()
+            return token
+
+        return self.refresh()
+
+    def refresh(self, stale_token=None):
+        if not self.has_service_account:
+            return self.static_token
+
+        with self._lock:
+            # Пока мы ждали блокировку, токен мог обновить другой поток
+            if self._token and self._token != stale_token and time.time() < self._expires_at - self.refresh_margin:
+                self._stats['hits'] += 1
+                return self._token
+            return self._fetch_token()
+
+    def invalidate(self, token):
+        return self.refresh(stale_token=token)
+
+    def stats(self):
+        return {
+            **self._stats,
+            'expires_in': max(0, int(self._expires_at - time.time())) if self._token else 0
+        }
+
+    def _start_background_refresh(self):
+        if self._failed_at is not None and time.monotonic() - self._failed_at < self.refresh_backoff:
+            return
+        if not self._background_guard.acquire(blocking=False):
+            return
+
+        thread = threading.Thread(target=self._background_refresh, name='iam-token-refresh', daemon=True)
+        thread.start()
+
+    def _background_refresh(self):
+        try:
+            with self._lock:
+                if time.time() < self._expires_at - self.refresh_margin:
+                    return
+                self._fetch_token()
+                self._stats['background_refreshes'] += 1
+        finally:
+            self._background_guard.release()
+
+    def _fetch_token(self):
+        try:
+            with stage('iam_refresh'):
+                response = get_http_client().post(self.token_url, json={"jwt": self._create_jwt()})
+            response.raise_for_status()
+            result = response.json()
+        except Exception as e:
+            status = getattr(getattr(e, 'response', None), 'status_code', None)
+            UPSTREAM_ERRORS.inc(service='iam', status=status or 'no_response')
+            self._stats['failures'] += 1
+            self._failed_at = time.monotonic()
+            logger.error(f"Failed to get IAM token: {str(e)}")
+            if self._token and time.time() < self._expires_at:
+                return self._token
+            return self.static_token
+
+        self._failed_at = None
+        self._token = result.get("iamToken")
+        self._expires_at = self._parse_expires_at(result.get("expiresAt"))
+        self._stats['refreshes'] += 1
+        logger.info("IAM token refreshed")
+        return self._token
+
+    def _create_jwt(self):
+        now = datetime.datetime.now(datetime.timezone.utc)
+
+        payload = {
+            "aud": self.token_url,
+            "iss": self.service_account_id,
+            "iat": now,
+            "exp": now + datetime.timedelta(hours=1)
+        }
+
+        return jwt.encode(
+            payload,
+            self.private_key,
+            algorithm="PS256",
+            headers={"kid": self.key_id}
+        )
+
+    @staticmethod
+    def _parse_expires_at(value):
+        if value:
+            try:
+                # Yandex Cloud возвращает RFC 3339 с наносекундами: 2025-04-18T21:41:48.123456789Z
+                main, _, fraction = value.rstrip('Z').partition('.')
+                expires = datetime.datetime.fromisoformat(main).replace(tzinfo=datetime.timezone.utc)
+                return expires.timestamp() + float(f"0.{fraction or 0}")
+            except ValueError:
+                logger.warning(f"Unexpected IAM token expiresAt format: {value}")
+        return time.time() + DEFAULT_TOKEN_TTL
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_token_manager():
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = IAMTokenManager()
+    return _manager
@@ -0,0 +1,164 @@
+import os
+import re
+import json
+import uuid
+import queue
+import atexit
+import random
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_DIR = os.getenv('LOG_DIR', '.')
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', 10000))
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv('LOG_PAYLOAD_SAMPLE_RATE', 0.01))
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv('LOG_PAYLOAD_MAX_CHARS', 500))
+
+REQUEST_ID_RE = re.compile(r'[A-Za-z0-9_.-]{1,64}')
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Логгеры обращений к Yandex Cloud дополнительно пишутся в отдельный файл, как и раньше
+YAGPT_LOGGERS = ('ai_generator', 'ai_generator_async', 'iam_token', 'http_client')
+ACCESS_LOGGER = 'access'
+
+_listener = None
+_queue_handler = None
+_setup_lock = threading.Lock()
+
+
+class Payload:
+    # Текст запроса или ответа форматируется и обрезается только при записи, а не в потоке обработки запроса
+    def __init__(self, value, max_chars=LOG_PAYLOAD_MAX_CHARS):
+        self.value = value
+        self.max_chars = max_chars
+
+    def __str__(self):
+        value = self.value
+        if not isinstance(value, str):
+            value = json.dumps(value, ensure_ascii=False, default=str)
+        if len(value) > self.max_chars:
+            return f"{value[:self.max_chars]}... [{len(value)} chars]"
+        return value
+
+
+def log_payload(logger, label, value):
+    # Полные промпты и ответы содержат персональные данные: пишем лишь небольшую выборку и в усеченном виде
+    if LOG_PAYLOAD_SAMPLE_RATE <= 0 or not logger.isEnabledFor(logging.INFO):
+        return
+    if random.random() < LOG_PAYLOAD_SAMPLE_RATE:
+        logger.info("%s: %s", label, Payload(value))
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Стандартный prepare форматирует запись целиком (время, формат) в вызывающем потоке;
+        # здесь подставляем только аргументы сообщения, остальное делает поток QueueListener.
+        # Сообщения с Payload не трогаем: их сериализацию и усечение выполнит поток QueueListener
+        if not (isinstance(record.args, tuple) and any(isinstance(arg, Payload) for arg in record.args)):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Если диск не успевает, теряем запись, но не задерживаем обработку запроса
+            self.dropped += 1
+
+
+class LoggerFilter(logging.Filter):
+    def __init__(self, names, exclude=False):
+        super().__init__()
+        self.names = tuple(names)
+        self.exclude = exclude
+
+    def filter(self, record):
+        matched = any(record.name == name or record.name.startswith(name + '.') for name in self.names)
+        return matched != self.exclude
+
+
+def rotating_handler(filename, formatter):
+    handler = RotatingFileHandler(
+        os.path.join(LOG_DIR, filename),
+        maxBytes=LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT,
+        encoding='utf-8'
+    )
+    handler.setFormatter(formatter)
+    return handler
+
+
+def setup_logging():
+    # Все записи попадают в ограниченную очередь; в файлы и консоль их пишет отдельный поток
+    global _listener, _queue_handler
+    with _setup_lock:
+        if _listener is not None:
+            return
+        os.makedirs(LOG_DIR, exist_ok=True)
+        text_formatter = logging.Formatter(LOG_FORMAT)
+
+        app_handler = rotating_handler('flask_app.log', text_formatter)
+        app_handler.addFilter(LoggerFilter([ACCESS_LOGGER], exclude=True))
+        yagpt_handler = rotating_handler('yagpt_requests.log', text_formatter)
+        yagpt_handler.addFilter(LoggerFilter(YAGPT_LOGGERS))
+        access_handler = rotating_handler('access.log', JSONFormatter())
+        access_handler.addFilter(LoggerFilter([ACCESS_LOGGER]))
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(text_formatter)
+        console_handler.addFilter(LoggerFilter([ACCESS_LOGGER], exclude=True))
+
+        log_queue = queue.Queue(LOG_QUEUE_SIZE)
+        root = logging.getLogger()
+        root.setLevel(LOG_LEVEL)
+        _queue_handler = NonBlockingQueueHandler(log_queue)
+        root.handlers = [_queue_handler]
+
+        _listener = QueueListener(log_queue, app_handler, yagpt_handler, access_handler, console_handler,
+                                  respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def make_request_id(header_value=None):
+    # X-Request-ID клиента попадает в логи, заголовки ответа и имена файлов профилей: принимаем только безопасные значения
+    if header_value and REQUEST_ID_RE.fullmatch(header_value):
+        return header_value
+    return uuid.uuid4().hex[:16]
+
+
+def log_request(fields):
+    logging.getLogger(ACCESS_LOGGER).info('request', extra={'fields': fields})
+
+
+def logging_stats():
+    if _queue_handler is None:
+        return {}
+    return {
+        'queued': _queue_handler.queue.qsize(),
+        'dropped': _queue_handler.dropped,
+        'payload_sample_rate': LOG_PAYLOAD_SAMPLE_RATE
+    }
@@ -0,0 +1,43 @@
+import threading
+import markdown
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+from metrics import stage
+
+MARKDOWN_EXTENSIONS = ['tables', 'sane_lists', 'fenced_code']
+
+
+class _TreeCapture(Treeprocessor):
+    def run(self, root):
+        self.md.tree = root
+
+
+class TreeCaptureExtension(Extension):
+    def extendMarkdown(self, md):
+        # Выполняется последним, после inline-разметки и unescape: дерево уже в итоговом виде
+        md.treeprocessors.register(_TreeCapture(md), 'capture_tree', -1)
+
+
+_local = threading.local()
+
+
+def get_markdown():
+    # Экземпляр Markdown не потокобезопасен, поэтому держим по одному на поток и сбрасываем перед разбором
+    md = getattr(_local, 'md', None)
+    if md is None:
+        md = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS + [TreeCaptureExtension()])
+        _local.md = md
+    return md.reset()
+
+
+def markdown_to_html(text):
+    with stage('markdown_parse'):
+        return get_markdown().convert(text)
+
+
+def markdown_to_tree(text):
+    # Сырой HTML и блоки кода остаются в дереве как плейсхолдеры; их содержимое возвращаем отдельно
+    md = get_markdown()
+    with stage('markdown_parse'):
+        md.convert(text)
+    return md.tree, list(md.htmlStash.rawHtmlBlocks)
@@ -0,0 +1,99 @@
+import os
+import logging
+import threading
+import pdfkit
+from concurrency import OverloadedError
+
+logger = logging.getLogger(__name__)
+
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', 2))
+PDF_QUEUE_TIMEOUT = float(os.getenv('PDF_QUEUE_TIMEOUT', 30))
+WKHTMLTOPDF_PATH = os.getenv('WKHTMLTOPDF_PATH', '')
+
+PDFKIT_CONFIG = {
+    'page-size': 'A4',
+    'margin-top': '0.75in',
+    'margin-right': '0.75in',
+    'margin-bottom': '0.75in',
+    'margin-left': '0.75in',
+    'encoding': 'UTF-8',
+    'quiet': ''
+}
+
+DEFAULT_CSS = """
+body { font-family: Arial, sans-serif; line-height: 1.6; }
+h1 { color: #2c3e50; border-bottom: 2px solid #3498db; }
+h2 { color: #2980b9; }
+ul { margin-left: 20px; }
+li { margin-bottom: 5px; }
+"""
+
+
+class HTMLShell:
+    def __init__(self, css=DEFAULT_CSS):
+        # Обертка документа собирается один раз: на запрос остается только склеить три строки
+        self.head = (
+            '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="UTF-8">\n'
+            f'<style>{css}</style>\n</head>\n<body>\n'
+        )
+        self.tail = '\n</body>\n</html>\n'
+
+    def wrap(self, html_body):
+        return ''.join((self.head, html_body, self.tail))
+
+
+class PDFRenderer:
+    def __init__(self, workers=PDF_WORKERS, queue_timeout=PDF_QUEUE_TIMEOUT, wkhtmltopdf=WKHTMLTOPDF_PATH):
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self.wkhtmltopdf = wkhtmltopdf
+        self.shell = HTMLShell()
+        self._configuration = None
+        self._config_lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(workers)
+        self._stats = {'rendered': 0, 'rejected': 0, 'failed': 0}
+
+    @property
+    def configuration(self):
+        # Без явной конфигурации pdfkit на каждый вызов запускает `which wkhtmltopdf`
+        if self._configuration is None:
+            with self._config_lock:
+                if self._configuration is None:
+                    self._configuration = pdfkit.configuration(wkhtmltopdf=self.wkhtmltopdf)
+                    logger.info(f"Using wkhtmltopdf at {self._configuration.wkhtmltopdf}")
+        return self._configuration
+
+    def render(self, html_body, shell=None):
+        html = (shell or self.shell).wrap(html_body)
+
+        # Каждый рендер - отдельный процесс wkhtmltopdf, поэтому их число ограничено размером пула
+        if not self._semaphore.acquire(timeout=self.queue_timeout):
+            self._stats['rejected'] += 1
+            raise OverloadedError()
+        try:
+            # output_path=False: PDF читается из stdout процесса, без временных файлов
+            pdf = pdfkit.from_string(html, False, options=PDFKIT_CONFIG, configuration=self.configuration)
+        except Exception:
+            self._stats['failed'] += 1
+            raise
+        finally:
+            self._semaphore.release()
+
+        self._stats['rendered'] += 1
+        return pdf
+
+    def stats(self):
+        return {**self._stats, 'workers': self.workers}
+
+
+_renderer = None
+_renderer_lock = threading.Lock()
+
+
+def get_pdf_renderer():
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = PDFRenderer()
+    return _renderer
@@ -0,0 +1,96 @@
+import os
+import re
+import sys
+import time
+import logging
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# Семплирующий профилировщик медленных запросов, включается явно: PROFILE_SLOW_REQUEST_MS > 0.
+# Пока запрос выполняется, фоновый поток раз в PROFILE_INTERVAL_MS снимает стек его потока; если запрос
+# оказался медленнее порога, стеки сохраняются в PROFILE_DIR в формате folded (flamegraph.pl, speedscope).
+PROFILE_SLOW_REQUEST_MS = float(os.getenv('PROFILE_SLOW_REQUEST_MS', 0))
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', 5))
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+
+UNSAFE_NAME_RE = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+def fold_stack(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)})".replace(';', ':'))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SlowRequestProfiler:
+    def __init__(self, threshold_ms=PROFILE_SLOW_REQUEST_MS, interval_ms=PROFILE_INTERVAL_MS, directory=PROFILE_DIR):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.directory = directory
+        self.dumped = 0
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='slow-request-profiler', daemon=True)
+                self._thread.start()
+
+    def stop(self, name, request_id, duration):
+        with self._lock:
+            samples = self._active.pop(threading.get_ident(), None)
+        if not samples or duration < self.threshold:
+            return None
+        safe_name = UNSAFE_NAME_RE.sub('_', name).strip('_')[:64]
+        safe_id = UNSAFE_NAME_RE.sub('_', str(request_id))[:64]
+        path = os.path.join(self.directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{safe_name}-{safe_id}.folded")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                for stack, count in samples.most_common():
+                    f.write(f"{stack} {count}\n")
+        except OSError as e:
+            # Профилировщик вызывается из teardown и call_on_close: его ошибка не должна ломать запрос
+            logger.error(f"Failed to save slow request profile {path}: {str(e)}")
+            return None
+        self.dumped += 1
+        logger.warning(f"Slow request {name} took {duration * 1000:.0f} ms, profile saved to {path}")
+        return path
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = list(self._active.items())
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for thread_id, samples in active:
+                frame = frames.get(thread_id)
+                if frame is not None and thread_id != me:
+                    samples[fold_stack(frame)] += 1
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler():
+    # None, если профилирование выключено
+    global _profiler
+    if PROFILE_SLOW_REQUEST_MS <= 0:
+        return None
+    if _profiler is None:
+        with _profiler_lock:
+            if _profiler is None:
+                _profiler = SlowRequestProfiler()
+    return _profiler
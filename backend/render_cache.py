@@ -0,0 +1,79 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+RENDER_CACHE_MAX_BYTES = int(os.getenv('RENDER_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+
+def make_render_key(resume_content, format_type, template):
+    digest = hashlib.sha256()
+    for part in (format_type, template, resume_content):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class RenderCache:
+    def __init__(self, max_bytes=RENDER_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'bytes_saved': 0, 'evictions': 0}
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self._stats['misses'] += 1
+                return None
+            self._data.move_to_end(key)
+            self._stats['hits'] += 1
+            self._stats['bytes_saved'] += len(value)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._data[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self._size -= len(evicted)
+                self._stats['evictions'] += 1
+
+    def record_not_modified(self, key):
+        with self._lock:
+            self._stats['not_modified'] += 1
+            value = self._data.get(key)
+            if value is not None:
+                self._stats['bytes_saved'] += len(value)
+
+    def stats(self):
+        requests_total = self._stats['hits'] + self._stats['misses'] + self._stats['not_modified']
+        served_without_render = self._stats['hits'] + self._stats['not_modified']
+        return {
+            **self._stats,
+            'hit_ratio': round(served_without_render / requests_total, 4) if requests_total else 0.0,
+            'entries': len(self._data),
+            'size_bytes': self._size,
+            'max_bytes': self.max_bytes
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_render_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = RenderCache()
+    return _cache
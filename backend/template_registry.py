@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+import yaml
+from docx.shared import RGBColor
+from pdf_renderer import HTMLShell
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.getenv('TEMPLATES_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates'))
+TEMPLATE_RELOAD_INTERVAL = float(os.getenv('TEMPLATE_RELOAD_INTERVAL', 2))
+
+REQUIRED_STYLES = ('primaryColor', 'secondaryColor', 'font', 'spacing')
+
+
+def validate_template(data, path):
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: template must be a mapping")
+    for key in ('id', 'name'):
+        if not data.get(key):
+            raise ValueError(f"{path}: missing '{key}'")
+
+    sections = (data.get('fields') or {}).get('sections')
+    if not isinstance(sections, list) or not sections:
+        raise ValueError(f"{path}: 'fields.sections' must be a non-empty list")
+    for section in sections:
+        if not isinstance(section, dict) or not section.get('name') or not section.get('title'):
+            raise ValueError(f"{path}: every section needs 'name' and 'title'")
+
+    styles = data.get('styles')
+    if not isinstance(styles, dict):
+        raise ValueError(f"{path}: missing 'styles'")
+    for key in REQUIRED_STYLES:
+        if key not in styles:
+            raise ValueError(f"{path}: missing 'styles.{key}'")
+    for key in ('primaryColor', 'secondaryColor'):
+        color = str(styles[key])
+        if len(color) != 7 or not color.startswith('#'):
+            raise ValueError(f"{path}: 'styles.{key}' must be a #RRGGBB color")
+        int(color[1:], 16)
+    float(styles['spacing'])
+
+
+class CompiledTemplate:
+    def __init__(self, data, path=None):
+        self.path = path
+        self.id = data['id']
+        # Версия меняется при любом изменении содержимого; входит в ключ кэша отрисованных файлов и ETag
+        self.version = hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+        self.name = data['name']
+        self.description = data.get('description', '')
+        self.sections = sorted(data['fields']['sections'], key=lambda section: section.get('priority', 0))
+        self.styles = data['styles']
+
+        self.prompt_fragment = self._compile_prompt()
+        self.css = self._compile_css()
+        self.html_shell = HTMLShell(self.css)
+        self.docx_styles = self._compile_docx_styles()
+
+    def _compile_prompt(self):
+        order = ", ".join(f"«{section['title']}»" for section in self.sections)
+        return (
+            f"Оформи резюме по шаблону «{self.name}» ({self.description.lower()}). "
+            f"Расположи разделы в следующем порядке и с такими заголовками: {order}."
+        )
+
+    def _compile_css(self):
+        primary = self.styles['primaryColor']
+        secondary = self.styles['secondaryColor']
+        return (
+            f"body {{ font-family: {self.styles['font']}; line-height: {self.styles['spacing']}; }}\n"
+            f"h1 {{ color: {primary}; border-bottom: 2px solid {primary}; }}\n"
+            f"h2 {{ color: {primary}; }}\n"
+            f"h3 {{ color: {secondary}; }}\n"
+            "ul { margin-left: 20px; }\n"
+            "li { margin-bottom: 5px; }\n"
+            f"th {{ background: {primary}; color: #ffffff; }}\n"
+            "table { border-collapse: collapse; }\n"
+            "td, th { border: 1px solid #cccccc; padding: 4px 8px; }\n"
+        )
+
+    def _compile_docx_styles(self):
+        return {
+            'font': self.styles['font'].split(',')[0].strip().strip('"\''),
+            'line_spacing': float(self.styles['spacing']),
+            'primary': RGBColor.from_string(self.styles['primaryColor'][1:].upper()),
+            'secondary': RGBColor.from_string(self.styles['secondaryColor'][1:].upper())
+        }
+
+
+class TemplateRegistry:
+    def __init__(self, directory=TEMPLATES_DIR, reload_interval=TEMPLATE_RELOAD_INTERVAL):
+        self.directory = directory
+        self.reload_interval = reload_interval
+        self._templates = {}
+        self._mtimes = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def get(self, template_id):
+        if not template_id:
+            return None
+        self._maybe_reload()
+        return self._templates.get(template_id)
+
+    def ids(self):
+        self._maybe_reload()
+        return sorted(self._templates)
+
+    def _maybe_reload(self):
+        if time.monotonic() - self._checked_at < self.reload_interval:
+            return
+        if not self._lock.acquire(blocking=False):
+            # Проверку уже выполняет другой поток: работаем с текущей версией шаблонов
+            return
+        try:
+            self._checked_at = time.monotonic()
+            if self._scan() != self._mtimes:
+                self._reload_locked()
+        finally:
+            self._lock.release()
+
+    def reload(self):
+        with self._lock:
+            self._reload_locked()
+
+    def _scan(self):
+        mtimes = {}
+        try:
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.name.endswith(('.yaml', '.yml')):
+                    mtimes[entry.path] = entry.stat().st_mtime_ns
+        except FileNotFoundError:
+            logger.warning(f"Templates directory not found: {self.directory}")
+        return mtimes
+
+    def _reload_locked(self):
+        mtimes = self._scan()
+        # Неизмененные файлы не перечитываем: берем уже скомпилированные шаблоны
+        loaded = {template.path: template for template in self._templates.values()}
+        templates = {}
+        for path in sorted(mtimes):
+            template = loaded.get(path) if self._mtimes.get(path) == mtimes[path] else None
+            if template is None:
+                try:
+                    with open(path, encoding='utf-8') as f:
+                        data = yaml.safe_load(f)
+                    validate_template(data, path)
+                    template = CompiledTemplate(data, path)
+                except (OSError, ValueError, TypeError, yaml.YAMLError) as e:
+                    logger.error(f"Skipping invalid template {path}: {str(e)}")
+                    continue
+                logger.info(f"Loaded template '{template.id}' from {path}")
+            templates[template.id] = template
+
+        self._templates = templates
+        self._mtimes = mtimes
+        self._checked_at = time.monotonic()
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_template_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = TemplateRegistry()
+    return _registry
+
+
+def get_template(template_id):
+    return get_template_registry().get(template_id)
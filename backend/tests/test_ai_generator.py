@@ -0,0 +1,137 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'benchmarks'))
+
+import mock_yandex
+from mock_yandex import start_mock_server, mock_env
+from http_client import HttpClient, BoundedWaitPoolMixin
+from iam_token import IAMTokenManager
+from ai_generator import YandexGPT
+from ai_generator_async import AsyncYandexGPT
+from response_cache import ResponseCache
+
+STATIC_TOKEN_ENV = {'YC_IAM_TOKEN': 'test-token', 'YC_SERVICE_ACCOUNT_ID': '', 'YC_ACCESS_KEY_ID': '', 'YC_PRIVATE_KEY': ''}
+
+
+def run_with_timeout(func, timeout):
+    result = {}
+
+    def target():
+        try:
+            result['value'] = func()
+        except Exception as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        raise AssertionError(f"call did not finish in {timeout} s")
+    return result
+
+
+class StreamErrorPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.server = start_mock_server(profile='fast', latency=0, jitter=0, error_rate=1.0)
+        self.addCleanup(self.server.shutdown)
+        env = mock_env(self.server)
+        with mock.patch.dict(os.environ, STATIC_TOKEN_ENV):
+            token_manager = IAMTokenManager(token_url=env['YC_IAM_TOKEN_URL'])
+        self.yagpt = YandexGPT()
+        self.yagpt.token_manager = token_manager
+        self.yagpt.http = HttpClient(pool_size=2, max_retries=2)
+        self.yagpt.api_url = env['YANDEX_GPT_API_URL']
+        self.addCleanup(self.yagpt.http.close)
+
+    def test_stream_errors_release_pooled_connections(self):
+        # Каждая попытка получает 5xx/429; при утечке соединений третий вызов ждал бы свободное соединение
+        with mock.patch('ai_generator.backoff_delay', return_value=0):
+            for _ in range(3):
+                result = run_with_timeout(lambda: list(self.yagpt.generate_stream('prompt', use_cache=False)), 10)
+                self.assertIn('error', result)
+                self.assertIn('Yandex GPT error', str(result['error']))
+
+
+class BoundedPoolWaitTest(unittest.TestCase):
+    def test_exhausted_pool_raises_instead_of_hanging(self):
+        server = start_mock_server(profile='fast', latency=0, jitter=0)
+        self.addCleanup(server.shutdown)
+        env = mock_env(server)
+        client = HttpClient(pool_size=1, max_retries=0)
+        self.addCleanup(client.close)
+
+        with mock.patch.object(BoundedWaitPoolMixin, 'pool_timeout', 0.5):
+            # Непрочитанный потоковый ответ занимает единственное соединение пула
+            held = client.post(env['YC_IAM_TOKEN_URL'], json={}, stream=True)
+            self.addCleanup(held.close)
+            started = time.monotonic()
+            result = run_with_timeout(lambda: client.post(env['YC_IAM_TOKEN_URL'], json={}), 5)
+
+        self.assertIn('error', result)
+        self.assertLess(time.monotonic() - started, 5)
+        held.close()
+        self.assertEqual(client.post(env['YC_IAM_TOKEN_URL'], json={}).status_code, 200)
+
+
+COMPLETION_RESULT = mock_yandex.completion_result
+
+
+def partial_result(text, status):
+    # Поток обрывается без ALTERNATIVE_STATUS_FINAL
+    return COMPLETION_RESULT(text, 'ALTERNATIVE_STATUS_PARTIAL')
+
+
+class StreamCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.server = start_mock_server(profile='fast', latency=0, jitter=0)
+        self.addCleanup(self.server.shutdown)
+        self.env = mock_env(self.server)
+
+    def make_client(self, cls):
+        with mock.patch.dict(os.environ, STATIC_TOKEN_ENV):
+            token_manager = IAMTokenManager(token_url=self.env['YC_IAM_TOKEN_URL'])
+        yagpt = cls()
+        yagpt.token_manager = token_manager
+        yagpt.cache = ResponseCache()
+        yagpt.api_url = self.env['YANDEX_GPT_API_URL']
+        return yagpt
+
+    def stream_sync(self):
+        yagpt = self.make_client(YandexGPT)
+        text = ''.join(yagpt.generate_stream('prompt'))
+        return yagpt, text
+
+    def stream_async(self):
+        yagpt = self.make_client(AsyncYandexGPT)
+
+        async def collect():
+            try:
+                return ''.join([chunk async for chunk in yagpt.generate_stream('prompt')])
+            finally:
+                await yagpt.aclose()
+        return yagpt, asyncio.run(collect())
+
+    def test_complete_stream_is_cached(self):
+        for stream in (self.stream_sync, self.stream_async):
+            yagpt, text = stream()
+            self.assertTrue(text)
+            self.assertEqual(yagpt.cache.stats()['memory_entries'], 1)
+
+    def test_stream_without_final_status_is_not_cached(self):
+        with mock.patch.object(mock_yandex, 'completion_result', partial_result):
+            for stream in (self.stream_sync, self.stream_async):
+                yagpt, text = stream()
+                self.assertTrue(text)
+                self.assertEqual(yagpt.cache.stats()['memory_entries'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
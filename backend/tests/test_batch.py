@@ -0,0 +1,25 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import run_batch
+
+
+class MalformedRecordsTest(unittest.TestCase):
+    def test_malformed_records_fail_individually(self):
+        records = ['x', {'id': 'a', 'user_data': 'x'}, {'id': 'b', 'user_data': {}}, 5]
+        results = {result['id']: result for result in run_batch(records, workers=1, rate_limit=0)}
+
+        self.assertEqual(set(results), {'0', 'a', 'b', '3'})
+        self.assertFalse(any(result['success'] for result in results.values()))
+        self.assertIn('user_data', results['a']['message'])
+
+    def test_completed_ids_skip_malformed_records(self):
+        results = list(run_batch(['x', {'id': 'a', 'user_data': 'x'}], workers=1, rate_limit=0, completed_ids=['0', 'a']))
+        self.assertEqual(results, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
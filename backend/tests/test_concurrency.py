@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from concurrency import ConcurrencyLimiter, OverloadedError
+
+
+class SharedBudgetTest(unittest.TestCase):
+    def test_threads_and_coroutines_share_one_limit(self):
+        limiter = ConcurrencyLimiter(limit=2, max_queue=100, queue_timeout=10)
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0, 'done': 0}
+
+        def enter():
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+
+        def leave():
+            with lock:
+                state['active'] -= 1
+                state['done'] += 1
+
+        def sync_worker():
+            with limiter.slot():
+                enter()
+                time.sleep(0.02)
+                leave()
+
+        async def async_worker():
+            async with limiter.aslot():
+                enter()
+                await asyncio.sleep(0.02)
+                leave()
+
+        async def run_async():
+            await asyncio.gather(*(async_worker() for _ in range(10)))
+
+        threads = [threading.Thread(target=sync_worker) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        asyncio.run(run_async())
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(state['done'], 20)
+        self.assertLessEqual(state['peak'], 2)
+        self.assertEqual(limiter.stats()['active'], 0)
+        self.assertEqual(limiter.stats()['waiting'], 0)
+
+    def test_async_wait_times_out_while_threads_hold_slots(self):
+        limiter = ConcurrencyLimiter(limit=1, max_queue=10, queue_timeout=0.1)
+
+        async def acquire():
+            async with limiter.aslot():
+                pass
+
+        with limiter.slot():
+            with self.assertRaises(OverloadedError):
+                asyncio.run(acquire())
+        asyncio.run(acquire())
+        self.assertEqual(limiter.stats()['rejected'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import os
+import sys
+import socket
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from urllib3.connection import HTTPConnection
+from http_client import HttpClient
+
+
+def closed_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class SingleRetryLayerTest(unittest.TestCase):
+    def test_adapter_does_not_retry_connection_errors(self):
+        client = HttpClient(max_retries=3)
+        self.addCleanup(client.close)
+        attempts = []
+        original_connect = HTTPConnection.connect
+
+        def counting_connect(connection):
+            attempts.append(1)
+            return original_connect(connection)
+
+        with mock.patch.object(HTTPConnection, 'connect', counting_connect):
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                client.post(f'http://127.0.0.1:{closed_port()}/', json={})
+
+        # Повторы делает только вызывающий код (_post), адаптер пробует соединиться один раз
+        self.assertEqual(len(attempts), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import unittest
+from unittest import mock
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, 'benchmarks'))
+
+import requests
+from mock_yandex import start_mock_server, mock_env
+from iam_token import IAMTokenManager
+
+
+class MockExpiresAtTest(unittest.TestCase):
+    def test_mock_token_ttl_is_parsed(self):
+        server = start_mock_server(profile='fast')
+        self.addCleanup(server.shutdown)
+        server.state.token_ttl = 120
+
+        result = requests.post(mock_env(server)['YC_IAM_TOKEN_URL'], json={}).json()
+        self.assertTrue(result['expiresAt'].endswith('Z'))
+        self.assertAlmostEqual(IAMTokenManager._parse_expires_at(result['expiresAt']) - time.time(), 120, delta=5)
+
+
+class BackgroundRefreshBackoffTest(unittest.TestCase):
+    def make_manager(self, token_url, refresh_backoff):
+        env = {'YC_SERVICE_ACCOUNT_ID': 'sa', 'YC_ACCESS_KEY_ID': 'key', 'YC_PRIVATE_KEY': 'private-key'}
+        with mock.patch.dict(os.environ, env):
+            manager = IAMTokenManager(token_url=token_url, refresh_margin=300, refresh_backoff=refresh_backoff)
+        manager._create_jwt = lambda: 'jwt'
+        # Токен еще действителен, но уже в окне фонового обновления
+        manager._token = 'current-token'
+        manager._expires_at = time.time() + 100
+        return manager
+
+    def call_repeatedly(self, manager, times):
+        for _ in range(times):
+            self.assertEqual(manager.get_token(), 'current-token')
+            time.sleep(0.02)
+
+    def test_failed_refresh_is_not_retried_on_every_call(self):
+        server = start_mock_server(profile='fast')
+        self.addCleanup(server.shutdown)
+        manager = self.make_manager(mock_env(server)['YC_IAM_TOKEN_URL'] + '/unavailable', refresh_backoff=60)
+
+        self.call_repeatedly(manager, 10)
+        self.assertEqual(manager.stats()['failures'], 1)
+
+    def test_refresh_resumes_after_backoff(self):
+        server = start_mock_server(profile='fast')
+        self.addCleanup(server.shutdown)
+        manager = self.make_manager(mock_env(server)['YC_IAM_TOKEN_URL'] + '/unavailable', refresh_backoff=0.1)
+
+        self.call_repeatedly(manager, 3)
+        manager.token_url = mock_env(server)['YC_IAM_TOKEN_URL']
+        time.sleep(0.15)
+        manager.get_token()
+        time.sleep(0.2)
+        self.assertTrue(manager.get_token().startswith('mock-iam-token-'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import sys
+import queue
+import logging
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_config import NonBlockingQueueHandler, Payload
+
+
+class RecordingPayload(Payload):
+    def __str__(self):
+        self.formatted_in = threading.current_thread()
+        return super().__str__()
+
+
+class DeferredPayloadTest(unittest.TestCase):
+    def setUp(self):
+        self.queue = queue.Queue()
+        self.logger = logging.getLogger('test_log_config')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.handler = NonBlockingQueueHandler(self.queue)
+        self.logger.addHandler(self.handler)
+        self.addCleanup(self.logger.removeHandler, self.handler)
+
+    def test_payload_is_not_formatted_in_calling_thread(self):
+        payload = RecordingPayload({'text': 'x' * 1000}, max_chars=10)
+        self.logger.info('%s: %s', 'label', payload)
+
+        record = self.queue.get_nowait()
+        self.assertFalse(hasattr(payload, 'formatted_in'))
+        self.assertTrue(record.getMessage().startswith('label: {"text": '))
+        self.assertIn('[1012 chars]', record.getMessage())
+
+    def test_plain_messages_are_resolved_in_prepare(self):
+        self.logger.info('%d items', 3)
+        record = self.queue.get_nowait()
+        self.assertEqual(record.msg, '3 items')
+        self.assertIsNone(record.args)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_config import make_request_id
+from profiler import SlowRequestProfiler
+
+
+class RequestIdTest(unittest.TestCase):
+    def test_safe_client_id_is_kept(self):
+        self.assertEqual(make_request_id('abc-123_x.y'), 'abc-123_x.y')
+
+    def test_unsafe_or_long_client_id_is_replaced(self):
+        for value in ('a/b', '../../etc', 'x' * 300, 'id with spaces', '', None):
+            request_id = make_request_id(value)
+            self.assertNotEqual(request_id, value)
+            self.assertRegex(request_id, r'^[0-9a-f]{16}$')
+
+
+class ProfileDumpTest(unittest.TestCase):
+    def profile_request(self, profiler, request_id):
+        profiler.start()
+        time.sleep(0.05)
+        return profiler.stop('/api/download-resume', request_id, 0.05)
+
+    def test_request_id_is_sanitized_in_filename(self):
+        with tempfile.TemporaryDirectory() as directory:
+            profiler = SlowRequestProfiler(threshold_ms=1, interval_ms=1, directory=directory)
+            path = self.profile_request(profiler, 'a/../b' + 'x' * 300)
+            self.assertEqual(os.path.dirname(path), directory)
+            self.assertTrue(os.path.exists(path))
+            self.assertLess(len(os.path.basename(path)), 160)
+
+    def test_dump_failure_does_not_raise(self):
+        with tempfile.NamedTemporaryFile() as not_a_directory:
+            profiler = SlowRequestProfiler(threshold_ms=1, interval_ms=1, directory=not_a_directory.name)
+            self.assertIsNone(self.profile_request(profiler, 'abc'))
+
+
+if __name__ == '__main__':
+    unittest.main()
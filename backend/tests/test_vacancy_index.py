@@ -0,0 +1,49 @@
+import os
+import sys
+import json
+import sqlite3
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vacancy_index import VacancyIndex
+
+
+class VacancyCountTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.db_path = os.path.join(self.directory.name, 'vacancies.db')
+
+    def write_dump(self, name, vacancies):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            for vacancy in vacancies:
+                f.write(json.dumps(vacancy, ensure_ascii=False) + '\n')
+        return path
+
+    def test_counter_tracks_inserts_and_replacements(self):
+        index = VacancyIndex(self.db_path)
+        index.ingest_jsonl(self.write_dump('a.jsonl', [
+            {'id': str(i), 'title': 'Python разработчик', 'company': 'ООО', 'skills': ['Python']} for i in range(5)
+        ] + [{'id': '1', 'title': 'Java разработчик', 'company': 'ООО', 'skills': ['Java']}]))
+
+        self.assertEqual(index.count(), 5)
+        self.assertEqual(index.stats()['vacancies'], 5)
+
+    def test_counter_is_initialized_for_existing_index(self):
+        index = VacancyIndex(self.db_path)
+        index.ingest_jsonl(self.write_dump('a.jsonl', [
+            {'id': str(i), 'title': 'Аналитик данных', 'company': 'ООО', 'skills': ['SQL']} for i in range(3)
+        ]))
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('DROP TABLE index_meta')
+        conn.commit()
+        conn.close()
+
+        self.assertEqual(VacancyIndex(self.db_path).count(), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
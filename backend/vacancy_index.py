@@ -0,0 +1,382 @@
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import difflib
+import logging
+import argparse
+import threading
+from collections import Counter
+from response_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+VACANCY_DB = os.getenv('VACANCY_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'vacancies.db'))
+VACANCY_DUMPS_DIR = os.getenv('VACANCY_DUMPS_DIR', '')
+VACANCY_PAGE_SIZE = int(os.getenv('VACANCY_PAGE_SIZE', 20))
+VACANCY_CANDIDATES = int(os.getenv('VACANCY_CANDIDATES', 200))
+VACANCY_QUERY_CACHE_SIZE = int(os.getenv('VACANCY_QUERY_CACHE_SIZE', 1024))
+VACANCY_QUERY_CACHE_TTL = int(os.getenv('VACANCY_QUERY_CACHE_TTL', 300))
+VACANCY_MMAP_SIZE = int(os.getenv('VACANCY_MMAP_SIZE', 256 * 1024 * 1024))
+
+INGEST_BATCH_SIZE = 5000
+SKILL_WEIGHT = 2.0
+LANG_WEIGHT = 0.1
+FUZZY_CUTOFF = 0.75
+PREFIX_EXPANSIONS = 16
+PREFIX_SCAN_LIMIT = 2000
+
+# Те же границы слов, что у токенизатора unicode61 в FTS5
+WORD_RE = re.compile(r'[^\W_]+')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS vacancies (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    company TEXT,
+    salary TEXT,
+    link TEXT,
+    lang TEXT,
+    skills TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS vacancies_fts USING fts5(
+    title, skills, tokenize = 'unicode61 remove_diacritics 2'
+);
+-- Словарь слов из названий вакансий: по нему префиксы и опечатки разворачиваются в точные термины
+CREATE TABLE IF NOT EXISTS title_terms (
+    term TEXT PRIMARY KEY,
+    docs INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ingest_state (
+    path TEXT PRIMARY KEY,
+    offset INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+-- Счетчики, которые дорого пересчитывать: count(*) по миллионам вакансий читает всю таблицу
+CREATE TABLE IF NOT EXISTS index_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+'''
+
+
+def normalize_text(text):
+    return str(text or '').lower().replace('ё', 'е')
+
+
+def words(text):
+    return WORD_RE.findall(normalize_text(text))
+
+
+def format_salary(salary):
+    # hh.ru отдает зарплату объектом {"from", "to", "currency"}
+    if not isinstance(salary, dict):
+        return str(salary) if salary else ''
+    low, high, currency = salary.get('from'), salary.get('to'), salary.get('currency') or ''
+    if low and high:
+        return f"{low}–{high} {currency}".strip()
+    if low:
+        return f"от {low} {currency}".strip()
+    if high:
+        return f"до {high} {currency}".strip()
+    return ''
+
+
+def normalize_vacancy(record):
+    # Поддерживаем как собственный формат, так и выгрузки hh.ru (name, employer, alternate_url, key_skills)
+    title = record.get('title') or record.get('name')
+    vacancy_id = record.get('id')
+    if not title or vacancy_id is None:
+        return None
+    company = record.get('company') or (record.get('employer') or {}).get('name', '')
+    skills = record.get('skills') or [skill.get('name', '') for skill in record.get('key_skills') or []]
+    if isinstance(skills, str):
+        skills = skills.split(',')
+    return {
+        'id': str(vacancy_id),
+        'title': str(title),
+        'company': str(company or ''),
+        'salary': format_salary(record.get('salary')),
+        'link': record.get('link') or record.get('alternate_url') or record.get('url') or '',
+        'lang': record.get('lang') or '',
+        'skills': ','.join(normalize_text(skill).strip() for skill in skills if str(skill).strip())
+    }
+
+
+class VacancyIndex:
+    def __init__(self, path=VACANCY_DB, cache_size=VACANCY_QUERY_CACHE_SIZE, cache_ttl=VACANCY_QUERY_CACHE_TTL):
+        self.path = path
+        self.cache = LRUCache(cache_size, cache_ttl)
+        # Номер поколения индекса входит в ключ кэша: после загрузки новых вакансий старые ответы не используются
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(SCHEMA)
+        with conn:
+            # Для индекса, созданного до появления счетчика, считаем вакансии один раз
+            conn.execute("INSERT OR IGNORE INTO index_meta (key, value) SELECT 'vacancies', count(*) FROM vacancies")
+        conn.close()
+
+    def _connection(self):
+        # Отдельное соединение на поток; чтение идет через mmap и не держит базу в памяти процесса
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute(f'PRAGMA mmap_size={VACANCY_MMAP_SIZE}')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def ingest_jsonl(self, path):
+        # Инкрементальная загрузка: запоминаем смещение в файле и при повторном запуске читаем только новые строки
+        path = os.path.abspath(path)
+        size = os.path.getsize(path)
+        with self._write_lock:
+            conn = self._connection()
+            row = conn.execute('SELECT offset FROM ingest_state WHERE path = ?', (path,)).fetchone()
+            offset = row[0] if row and row[0] <= size else 0
+            if offset == size:
+                return 0
+
+            added = skipped = 0
+            batch = []
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        # Недописанная строка: заберем ее при следующей загрузке
+                        break
+                    offset += len(line)
+                    if not line.strip():
+                        continue
+                    try:
+                        vacancy = normalize_vacancy(json.loads(line))
+                    except (ValueError, AttributeError):
+                        vacancy = None
+                    if vacancy is None:
+                        skipped += 1
+                        continue
+                    batch.append(vacancy)
+                    if len(batch) >= INGEST_BATCH_SIZE:
+                        added += self._store(conn, batch, path, offset, size)
+                        batch = []
+            added += self._store(conn, batch, path, offset, size)
+
+        if skipped:
+            logger.warning(f"Skipped {skipped} invalid vacancy records in {path}")
+        logger.info(f"Ingested {added} vacancies from {path}")
+        if added:
+            self.generation += 1
+        return added
+
+    def _store(self, conn, batch, path, offset, size):
+        terms = Counter()
+        replaced = 0
+        with conn:
+            for vacancy in batch:
+                # Повторная выгрузка той же вакансии заменяет старую запись
+                old = conn.execute('SELECT rowid, title FROM vacancies WHERE id = ?', (vacancy['id'],)).fetchone()
+                if old:
+                    conn.execute('DELETE FROM vacancies WHERE rowid = ?', (old[0],))
+                    conn.execute('DELETE FROM vacancies_fts WHERE rowid = ?', (old[0],))
+                    terms.subtract(set(words(old[1])))
+                    replaced += 1
+                cursor = conn.execute(
+                    'INSERT INTO vacancies (id, title, company, salary, link, lang, skills) '
+                    'VALUES (:id, :title, :company, :salary, :link, :lang, :skills)',
+                    vacancy
+                )
+                conn.execute(
+                    'INSERT INTO vacancies_fts (rowid, title, skills) VALUES (?, ?, ?)',
+                    (cursor.lastrowid, normalize_text(vacancy['title']), vacancy['skills'].replace(',', ' '))
+                )
+                terms.update(set(words(vacancy['title'])))
+            conn.executemany(
+                'INSERT INTO title_terms (term, docs) VALUES (?, ?) '
+                'ON CONFLICT(term) DO UPDATE SET docs = docs + excluded.docs',
+                [(term, count) for term, count in terms.items() if count]
+            )
+            conn.execute(
+                'INSERT OR REPLACE INTO ingest_state (path, offset, size) VALUES (?, ?, ?)',
+                (path, offset, size)
+            )
+            conn.execute("UPDATE index_meta SET value = value + ? WHERE key = 'vacancies'", (len(batch) - replaced,))
+        return len(batch)
+
+    def ingest_dir(self, directory):
+        total = 0
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(('.jsonl', '.ndjson')):
+                total += self.ingest_jsonl(os.path.join(directory, name))
+        return total
+
+    def _expand(self, conn, term, fuzzy):
+        # Префиксный запрос FTS5 ("term"*) строит список документов целиком и при миллионах вакансий
+        # занимает десятки миллисекунд; OR по нескольким точным терминам из словаря выполняется лениво
+        rows = conn.execute(
+            'SELECT term, docs FROM (SELECT term, docs FROM title_terms WHERE term >= ? AND term < ? LIMIT ?) '
+            'WHERE docs > 0',
+            (term[:2] if fuzzy else term, (term[:2] if fuzzy else term) + '\uffff', PREFIX_SCAN_LIMIT)
+        ).fetchall()
+        if not fuzzy:
+            rows.sort(key=lambda row: -row[1])
+            return [row[0] for row in rows[:PREFIX_EXPANSIONS]]
+        # Опечатки: похожие слова словаря с тем же началом
+        if len(term) < 4:
+            return []
+        return difflib.get_close_matches(term, [row[0] for row in rows], n=3, cutoff=FUZZY_CUTOFF)
+
+    def _match_query(self, conn, terms, fuzzy):
+        parts = []
+        for term in terms:
+            variants = self._expand(conn, term, fuzzy)
+            if not variants:
+                return None
+            parts.append('(' + ' OR '.join(f'"{variant}"' for variant in variants) + ')')
+        return 'title : (' + ' AND '.join(parts) + ')'
+
+    def _candidates(self, position):
+        conn = self._connection()
+        terms = words(position)
+        if not terms:
+            return []
+        # Сначала поиск по префиксам слов; нечеткий - только если он ничего не нашел.
+        # Кандидатов берем из самых свежих вакансий (rowid по убыванию): FTS5 не ранжирует все совпадения,
+        # поэтому время запроса не растет вместе с числом вакансий
+        for fuzzy in (False, True):
+            query = self._match_query(conn, terms, fuzzy)
+            if query is None:
+                continue
+            rows = conn.execute(
+                'SELECT rowid, id, title, company, salary, link, lang, skills FROM vacancies WHERE rowid IN '
+                '(SELECT rowid FROM vacancies_fts WHERE vacancies_fts MATCH ? ORDER BY rowid DESC LIMIT ?)',
+                (query, VACANCY_CANDIDATES)
+            ).fetchall()
+            if rows:
+                return rows
+        return []
+
+    def _rank(self, rows, position, skills, lang):
+        terms = words(position)
+        user_skills = {normalize_text(skill).strip() for skill in skills if str(skill).strip()}
+        ranked = []
+        for rowid, vacancy_id, title, company, salary, link, vacancy_lang, vacancy_skills in rows:
+            title_words = words(title)
+            # Полное совпадение слова ценнее совпадения по префиксу или нечеткого
+            title_score = sum(
+                1.0 if term in title_words else 0.5 if any(word.startswith(term) for word in title_words) else 0.25
+                for term in terms
+            ) / len(terms)
+            skill_score = 0.0
+            if user_skills and vacancy_skills:
+                skill_score = len(user_skills & set(vacancy_skills.split(','))) / len(user_skills)
+            score = title_score + SKILL_WEIGHT * skill_score + (LANG_WEIGHT if lang and vacancy_lang == lang else 0.0)
+            ranked.append((-score, -rowid, {
+                'id': vacancy_id,
+                'title': title,
+                'company': company,
+                'salary': salary,
+                'link': link,
+                'score': round(score, 3)
+            }))
+        ranked.sort(key=lambda item: item[:2])
+        return [item[2] for item in ranked]
+
+    def search(self, position, skills=(), lang=None, page=1, per_page=VACANCY_PAGE_SIZE):
+        page = max(int(page), 1)
+        per_page = max(min(int(per_page), VACANCY_CANDIDATES), 1)
+        key = (self.generation, normalize_text(position).strip(), tuple(sorted(normalize_text(s) for s in skills)), lang)
+        ranked = self.cache.get(key)
+        with self._stats_lock:
+            if ranked is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if ranked is None:
+            ranked = self._rank(self._candidates(position), position, skills, lang)
+            self.cache.set(key, ranked)
+        start = (page - 1) * per_page
+        return ranked[start:start + per_page], start + per_page < len(ranked)
+
+    def iter_search(self, position, skills=(), lang=None, per_page=VACANCY_PAGE_SIZE):
+        page = 1
+        while True:
+            results, has_more = self.search(position, skills, lang, page, per_page)
+            yield from results
+            if not has_more:
+                return
+            page += 1
+
+    def count(self):
+        return self._connection().execute("SELECT value FROM index_meta WHERE key = 'vacancies'").fetchone()[0]
+
+    def stats(self):
+        with self._stats_lock:
+            total = self.hits + self.misses
+            return {
+                'vacancies': self.count(),
+                'query_cache_hits': self.hits,
+                'query_cache_misses': self.misses,
+                'query_cache_hit_ratio': round(self.hits / total, 3) if total else 0.0
+            }
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_vacancy_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = VacancyIndex()
+                if VACANCY_DUMPS_DIR and os.path.isdir(VACANCY_DUMPS_DIR):
+                    # Догружаем новые выгрузки в фоне, чтобы не задерживать запуск сервера
+                    threading.Thread(target=_index.ingest_dir, args=(VACANCY_DUMPS_DIR,),
+                                     name='vacancy-ingest', daemon=True).start()
+    return _index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Локальный индекс вакансий')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    ingest = subparsers.add_parser('ingest', help='загрузить вакансии из JSONL-файлов (повторно читаются только новые строки)')
+    ingest.add_argument('paths', nargs='+', help='JSONL-файлы или каталоги с выгрузками')
+    search = subparsers.add_parser('search', help='найти вакансии')
+    search.add_argument('position', help='название должности')
+    search.add_argument('-s', '--skills', default='', help='навыки через запятую')
+    search.add_argument('-p', '--page', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    index = VacancyIndex()
+    if args.command == 'ingest':
+        started = time.monotonic()
+        total = 0
+        for path in args.paths:
+            total += index.ingest_dir(path) if os.path.isdir(path) else index.ingest_jsonl(path)
+        logger.info(f"Ingested {total} vacancies in {time.monotonic() - started:.1f}s, index size {index.count()}")
+    else:
+        started = time.perf_counter()
+        results, has_more = index.search(args.position, [s for s in args.skills.split(',') if s.strip()], page=args.page)
+        elapsed = (time.perf_counter() - started) * 1000
+        for vacancy in results:
+            print(json.dumps(vacancy, ensure_ascii=False))
+        logger.info(f"{len(results)} results in {elapsed:.1f} ms, more pages: {has_more}")
+    return 0
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    sys.exit(main())
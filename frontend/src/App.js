@@ -332,6 +332,7 @@ function App() {
           resume_content: generatedResume,
           format: format,
           file_name: `${userData.name || 'resume'}_${new Date().toISOString().slice(0,10)}`,
+          template: activeTemplate,
           options: exportOptions
         }),
       });
@@ -389,7 +390,12 @@ function App() {
       const response = await fetch('/api/ats-check', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ resume: generatedResume })
+        body: JSON.stringify({
+          resume: generatedResume,
+          target_position: userData.target_position,
+          template: activeTemplate,
+          lang: language
+        })
       });
       const data = await response.json();
       setAtsResult(data);
@@ -402,7 +408,12 @@ function App() {
   // Поиск вакансий
   const searchVacancies = async () => {
     try {
-      const response = await fetch(`/api/vacancies?position=${userData.target_position}&lang=${language}`);
+      const params = new URLSearchParams({
+        position: userData.target_position,
+        skills: userData.skills.join(','),
+        lang: language
+      });
+      const response = await fetch(`/api/vacancies?${params}`);
       const data = await response.json();
       setVacancies(data);
       unlockAchievement('vacancies-searched');